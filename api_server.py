@@ -0,0 +1,347 @@
+# api_server.py
+# 无界面的 JSON API 服务（Tornado）：与 Streamlit 页面共用同一套加载函数与进程级缓存，
+# 供其他服务按需读取 Polymarket 事件与 RWA 时间序列。
+#
+# 启动：python api_server.py [--port 8600]
+#
+# 接口：
+#   GET /api/events?active=true&start_date=2024-09-01&end_date=2025-12-31&volume_min=1000000
+#                  &page=0&page_size=20&fields=slug,title,volume
+#   GET /api/events/<slug>?fields=title,markets
+#   GET /api/rwa/tables
+#   GET /api/rwa/<table>?columns=A,B&granularity=日&start=2024-01-01&end=2024-12-31
+#                       &format=long|wide&max_points=1000&page=0&page_size=1000
+#   GET /api/metrics
+#   GET /healthz
+#
+# 所有 GET 响应带 ETag（If-None-Match 命中时返回 304），客户端接受 gzip 时返回预压缩的响应体。
+# 同一请求在数据未变化时复用已序列化的响应体，缓存命中路径不做序列化与压缩。
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import tornado.web
+from sqlalchemy.exc import SQLAlchemyError
+from cache import TTLCache
+from config import get_env_int
+from db import get_pool_stats
+from http_client import get_http_stats
+from instrumentation import get_span_stats
+from polymarket import (
+    DEFAULT_START_DATE,
+    DEFAULT_END_DATE,
+    DEFAULT_VOLUME_MIN,
+    DEFAULT_PAGE_SIZE,
+    build_event_params,
+    fetch_events,
+    fetch_event_detail,
+    get_events_cache_stats,
+    get_detail_cache_stats
+)
+from refresher import start_background_refresher, get_refresher_status
+import rwa
+
+MAX_EVENTS_PAGE_SIZE = 100
+MAX_RWA_PAGE_SIZE = 10000
+DEFAULT_RWA_PAGE_SIZE = 1000
+
+# 小于该字节数的响应不压缩
+GZIP_MIN_BYTES = 1024
+
+# 粒度参数同时接受页面上的中文名称与 pandas 频率简写
+GRANULARITY_ALIASES = {"D": "日", "W": "周", "M": "月", **{k: k for k in rwa.GRANULARITIES}}
+
+# 阻塞的加载函数（HTTP 请求、数据库查询、序列化）在线程池中执行，不占用事件循环
+_executor = ThreadPoolExecutor(
+    max_workers=get_env_int("API_WORKERS", 8),
+    thread_name_prefix="api-worker"
+)
+
+
+class _Body:
+    """已序列化的响应体：source 为生成它的数据对象，对象未变化时直接复用"""
+
+    __slots__ = ("source", "body", "etag", "gzipped")
+
+    def __init__(self, source, body):
+        self.source = source
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.gzipped = None
+
+
+# 请求键 -> 已序列化的响应体（只按内存上限淘汰，是否可用由 source 是否变化决定）
+_bodies = TTLCache(
+    ttl=float("inf"),
+    max_bytes=get_env_int("API_BODY_CACHE_MB", 64) * 1024 * 1024,
+    sizeof=lambda b: len(b.body) + len(b.gzipped or b"")
+)
+
+
+def _parse_list(value):
+    """逗号分隔的参数转为列表，空值返回 None"""
+    if not value:
+        return None
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _parse_date(value, default, name):
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise tornado.web.HTTPError(400, f"{name} 格式应为 YYYY-MM-DD")
+
+
+def _numeric_columns(table):
+    """表的数值列；表不存在或数据库不可用时返回 None"""
+    try:
+        return rwa.list_rwa_numeric_columns(table)
+    except (SQLAlchemyError, ConnectionError) as e:
+        print(f"⚠️ 读取表 {table} 的列失败：{e}")
+        return None
+
+
+def _project(record, fields):
+    """列投影：只保留请求的字段"""
+    if not fields:
+        return record
+    return {k: record.get(k) for k in fields}
+
+
+class BaseHandler(tornado.web.RequestHandler):
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+
+    def write_error(self, status_code, **kwargs):
+        # 状态行只能是 ASCII，中文错误信息放在 HTTPError 的 log_message 中返回给客户端
+        error = kwargs.get("exc_info", (None, None))[1]
+        message = getattr(error, "log_message", None) or self._reason
+        self.finish(json.dumps({"error": message}, ensure_ascii=False))
+
+    def compute_etag(self):
+        # ETag 在序列化时已算好，避免 Tornado 对每个响应体重新求哈希
+        return getattr(self, "_etag", None)
+
+    def get_int(self, name, default, minimum=0, maximum=None):
+        value = self.get_query_argument(name, None)
+        if value is None or value == "":
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"{name} 必须是整数")
+        if value < minimum or (maximum is not None and value > maximum):
+            raise tornado.web.HTTPError(400, f"{name} 超出范围")
+        return value
+
+    async def run(self, func, *args):
+        """在线程池中执行阻塞函数"""
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+    async def send_json(self, key, source, serialize):
+        """
+        发送 JSON 响应。source 为本次使用的数据对象（缓存中的共享对象），
+        与上次序列化时相同则复用响应体、ETag 与压缩结果。
+        """
+        entry = _bodies.peek(key)
+        cached = entry.value if entry is not None else None
+        if cached is None or cached.source is not source:
+            cached = _Body(source, await self.run(serialize))
+            _bodies.set(key, cached)
+
+        self.add_header("Vary", "Accept-Encoding")
+        body = cached.body
+        etag = cached.etag
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in self.request.headers.get("Accept-Encoding", ""):
+            if cached.gzipped is None:
+                cached.gzipped = await self.run(gzip.compress, body, 5)
+                # 重新写入，使压缩结果计入 API_BODY_CACHE_MB（条目已被替换时不覆盖新条目）
+                entry = _bodies.peek(key)
+                if entry is not None and entry.value is cached:
+                    _bodies.set(key, cached)
+            body = cached.gzipped
+            etag += "-gz"
+            self.set_header("Content-Encoding", "gzip")
+        self._etag = f'"{etag}"'
+        self.finish(body)
+
+
+class EventsHandler(BaseHandler):
+    """事件列表：与页面侧边栏相同的筛选参数，按 gamma API 的 offset 分页"""
+
+    async def get(self):
+        active = self.get_query_argument("active", None)
+        if active not in (None, "true", "false"):
+            raise tornado.web.HTTPError(400, "active 只能是 true 或 false")
+        page = self.get_int("page", 0)
+        page_size = self.get_int("page_size", DEFAULT_PAGE_SIZE, minimum=1,
+                                 maximum=MAX_EVENTS_PAGE_SIZE)
+        params = build_event_params(
+            page_size=page_size,
+            page=page,
+            active=active,
+            start_date=_parse_date(self.get_query_argument("start_date", None),
+                                   DEFAULT_START_DATE, "start_date"),
+            end_date=_parse_date(self.get_query_argument("end_date", None),
+                                 DEFAULT_END_DATE, "end_date"),
+            volume_min=self.get_int("volume_min", DEFAULT_VOLUME_MIN)
+        )
+        fields = _parse_list(self.get_query_argument("fields", None))
+
+        events = await self.run(fetch_events, params)
+
+        def serialize():
+            return json.dumps({
+                "page": page,
+                "page_size": page_size,
+                "count": len(events),
+                "items": [_project(e, fields) for e in events]
+            }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        key = ("events", tuple(sorted(params.items())), tuple(fields or ()))
+        await self.send_json(key, events, serialize)
+
+
+class EventDetailHandler(BaseHandler):
+    """单个事件详情（含 markets）"""
+
+    async def get(self, slug):
+        fields = _parse_list(self.get_query_argument("fields", None))
+        event = await self.run(fetch_event_detail, slug)
+        if event is None:
+            raise tornado.web.HTTPError(404, f"未找到事件 {slug}")
+
+        def serialize():
+            return json.dumps(_project(event, fields), ensure_ascii=False,
+                              separators=(",", ":")).encode("utf-8")
+
+        await self.send_json(("event", slug, tuple(fields or ())), event, serialize)
+
+
+class RwaTablesHandler(BaseHandler):
+    """可查询的 RWA 表及其数值列"""
+
+    async def get(self):
+        names = await self.run(rwa.list_rwa_tables)
+        columns = await self.run(lambda: [_numeric_columns(t) for t in names])
+        tables = {t: c for t, c in zip(names, columns) if c is not None}
+        self.finish(json.dumps({"tables": tables}, ensure_ascii=False))
+
+
+class RwaSeriesHandler(BaseHandler):
+    """
+    RWA 时间序列：columns 投影到数据库/快照读取，按粒度聚合与降采样后返回。
+    format=long 返回 (Date, column, Value) 行；format=wide 每个日期一行。
+    """
+
+    async def get(self, table):
+        if table not in rwa.RWA_TABLES and table not in await self.run(rwa.list_rwa_tables):
+            raise tornado.web.HTTPError(404, f"未知的 RWA 表 {table}")
+        granularity = GRANULARITY_ALIASES.get(self.get_query_argument("granularity", "日"))
+        if granularity is None:
+            raise tornado.web.HTTPError(400, "granularity 只能是 日/周/月 或 D/W/M")
+        output = self.get_query_argument("format", "long")
+        if output not in ("long", "wide"):
+            raise tornado.web.HTTPError(400, "format 只能是 long 或 wide")
+        # 日期范围在读取时过滤（结束日期包含当天），降采样只作用于范围内的数据
+        start = _parse_date(self.get_query_argument("start", None), None, "start")
+        end = _parse_date(self.get_query_argument("end", None), None, "end")
+        start = start.date() if start is not None else None
+        end = end.date() if end is not None else None
+        max_points = self.get_int("max_points", rwa.MAX_POINTS_PER_SERIES) or None
+        page = self.get_int("page", 0)
+        page_size = self.get_int("page_size", DEFAULT_RWA_PAGE_SIZE, minimum=1,
+                                 maximum=MAX_RWA_PAGE_SIZE)
+
+        available = await self.run(_numeric_columns, table)
+        if available is None:
+            raise tornado.web.HTTPError(503, f"无法读取表 {table}")
+        columns = _parse_list(self.get_query_argument("columns", None)) or available
+        unknown = [c for c in columns if c not in available]
+        if unknown:
+            raise tornado.web.HTTPError(400, f"未知的列：{', '.join(unknown)}")
+
+        series = await self.run(rwa.load_rwa_series, table, columns, granularity,
+                                "column", max_points, start, end)
+
+        def serialize():
+            df = series
+            if output == "wide":
+                df = df.pivot_table(index="Date", columns="column", values="Value",
+                                    observed=True).reset_index()
+            total = len(df)
+            rows = df.iloc[page * page_size:(page + 1) * page_size]
+            meta = json.dumps({
+                "table": table,
+                "granularity": granularity,
+                "format": output,
+                "total": total,
+                "page": page,
+                "page_size": page_size
+            }, ensure_ascii=False, separators=(",", ":"))
+            # 行数据用 pandas 的 C 实现序列化，再拼入外层对象
+            items = rows.to_json(orient="records", date_format="iso", force_ascii=False)
+            return (meta[:-1] + ',"items":' + items + "}").encode("utf-8")
+
+        key = ("rwa", table, tuple(sorted(columns)), granularity, output, max_points,
+               start, end, page, page_size)
+        await self.send_json(key, series, serialize)
+
+
+class MetricsHandler(BaseHandler):
+    """进程内的缓存、连接池、gamma 请求与 span 统计"""
+
+    def get(self):
+        self.finish(json.dumps({
+            "spans": get_span_stats(),
+            "events_cache": get_events_cache_stats(),
+            "detail_cache": get_detail_cache_stats(),
+            "rwa_cache": rwa.get_rwa_cache_stats(),
+            "response_cache": _bodies.stats(),
+            "db_pool": get_pool_stats(),
+            "gamma_http": get_http_stats(),
+            "refresher": get_refresher_status()
+        }, ensure_ascii=False, default=str))
+
+
+class HealthHandler(BaseHandler):
+
+    def get(self):
+        self.finish(b'{"status":"ok"}')
+
+
+def make_app():
+    return tornado.web.Application([
+        (r"/api/events", EventsHandler),
+        (r"/api/events/([^/]+)", EventDetailHandler),
+        (r"/api/rwa/tables", RwaTablesHandler),
+        (r"/api/rwa/([^/]+)", RwaSeriesHandler),
+        (r"/api/metrics", MetricsHandler),
+        (r"/healthz", HealthHandler)
+    ])
+
+
+async def serve(port):
+    # 与页面相同的后台刷新，保持默认筛选条件与各 RWA 表的缓存处于预热状态
+    start_background_refresher()
+    make_app().listen(port)
+    print(f"✅ API 服务已启动：http://0.0.0.0:{port}")
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Polymarket / RWA JSON API 服务")
+    parser.add_argument("--port", type=int, default=get_env_int("API_PORT", 8600))
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.port))
+
+
+if __name__ == "__main__":
+    main()
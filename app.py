@@ -1,16 +1,50 @@
+import os
 import streamlit as st
-import requests
 import pandas as pd
-from datetime import datetime
-from translation import get_translation, LANGUAGES
+from translation import get_labels, available_languages
+from http_client import get_http_stats
+from polymarket import (
+    DEFAULT_START_DATE,
+    DEFAULT_END_DATE,
+    DEFAULT_VOLUME_MIN,
+    DEFAULT_PAGE_SIZE,
+    build_event_params,
+    fetch_events,
+    get_events_age,
+    fetch_all_events,
+    resolve_event_detail,
+    prefetch_event_details,
+    get_events_cache_stats,
+    get_detail_cache_stats
+)
+from refresher import start_background_refresher, get_refresher_status
+from views import register_view, dispatch, warm_modules
+from search_index import EventIndex
+from rwa_catalog import RWA_CATALOG, DEFAULT_ASSET_TYPE
+from normalize import (
+    EVENT_COLUMNS,
+    VOLUME_PERIODS,
+    events_to_frame,
+    outcomes_to_frame,
+    market_detail_frame,
+    translate_columns
+)
+from instrumentation import (
+    PROFILE_MODES,
+    instrumentation_enabled,
+    start_trace,
+    end_trace,
+    get_span_stats,
+    span
+)
 
-# 定义语言列表（用于索引查找）
-LANGUAGE_KEYS = list(LANGUAGES.keys())
+# 定义语言列表（用于索引查找）：内置语言加上翻译目录中的语言文件
+LANGUAGE_KEYS = available_languages()
 DEFAULT_LANGUAGE = "English"  # 默认语言设为英文
 
 # 在任何 Streamlit 命令之前初始化语言
 query_lang = st.query_params.get("lang", [DEFAULT_LANGUAGE])[0]
-if query_lang in LANGUAGES:
+if query_lang in LANGUAGE_KEYS:
     default_language = query_lang
 else:
     default_language = st.session_state.get("language", DEFAULT_LANGUAGE)
@@ -18,14 +52,27 @@ else:
 # 设置会话状态（在 set_page_config 之前）
 st.session_state.language = default_language
 
+# 本次运行的标签包（语言在一次运行中不会变化，之后直接用属性访问）
+labels = get_labels(st.session_state.language)
+
 # 设置页面配置（必须是第一个 Streamlit 命令）
 st.set_page_config(
-    page_title=get_translation("page_title", st.session_state.language),
+    page_title=labels.page_title,
     layout="wide"
 )
 
+# 启动后台刷新线程（每个进程一次），保持热点数据的缓存处于预热状态
+start_background_refresher()
+
+# 管理员（设置 ADMIN_TOKEN 后通过 ?admin=<token> 访问）可在侧边栏查看本次运行的耗时分解
+admin_token = os.getenv("ADMIN_TOKEN")
+is_admin = bool(admin_token) and st.query_params.get("admin") == admin_token
+if is_admin or instrumentation_enabled():
+    start_trace(st.session_state.get("view", "predict_market"),
+                profile=st.session_state.get("profile_mode") if is_admin else None)
+
 # 主标题
-st.title(get_translation("page_header", st.session_state.language))
+st.title(labels.page_header)
 
 # ====== 侧边栏部分 ======
 with st.sidebar:
@@ -35,7 +82,7 @@ with st.sidebar:
     # 展开面板1："预测市场"
     with st.expander("预测市场", expanded=False):  # 默认收起
         language = st.selectbox(
-            get_translation("language_selector", st.session_state.language),
+            labels.language_selector,
             LANGUAGE_KEYS,
             index=LANGUAGE_KEYS.index(st.session_state.language),
             key="predict_market_lang_selectbox"
@@ -45,52 +92,66 @@ with st.sidebar:
             st.query_params["lang"] = language
             st.rerun()
 
-        st.header(get_translation("sidebar_header", st.session_state.language))
+        st.header(labels.sidebar_header)
         active_option = st.selectbox(
-            get_translation("active_option_label", st.session_state.language),
+            labels.active_option_label,
             options=[
-                get_translation("active_option_all", st.session_state.language),
-                get_translation("active_option_active", st.session_state.language),
-                get_translation("active_option_inactive", st.session_state.language)
+                labels.active_option_all,
+                labels.active_option_active,
+                labels.active_option_inactive
             ]
         )
 
         start_date = st.date_input(
-            get_translation("start_date_label", st.session_state.language),
-            value=datetime(2024, 9, 1)
+            labels.start_date_label,
+            value=DEFAULT_START_DATE
         )
         end_date = st.date_input(
-            get_translation("end_date_label", st.session_state.language),
-            value=datetime(2025, 12, 31)
+            labels.end_date_label,
+            value=DEFAULT_END_DATE
         )
 
         volume_min = st.slider(
-            get_translation("volume_min_label", st.session_state.language),
-            min_value=0, max_value=10000000, value=1000000, step=100000
+            labels.volume_min_label,
+            min_value=0, max_value=10000000, value=DEFAULT_VOLUME_MIN, step=100000
         )
 
         page_size = st.slider(
-            get_translation("page_size_label", st.session_state.language),
-            min_value=10, max_value=50, value=20
+            labels.page_size_label,
+            min_value=10, max_value=50, value=DEFAULT_PAGE_SIZE
+        )
+
+        # 本地检索（在已获取的事件中查找，不额外请求 API）
+        keyword = st.text_input(labels.keyword_label)
+        tag_query = st.text_input(labels.tag_filter_label)
+
+        # 一次并发加载全部事件，之后的翻页与排序在本地完成
+        bulk_mode = st.checkbox(
+            labels.bulk_mode_label,
+            value=False
+        )
+        sort_options = {
+            labels.sort_default: None,
+            labels.sort_volume: "volume",
+            labels.sort_start_date: "startDate",
+            labels.sort_end_date: "endDate"
+        }
+        sort_label = st.selectbox(
+            labels.sort_by_label,
+            options=list(sort_options.keys())
         )
 
         if "page" not in st.session_state:
             st.session_state.page = 0
-        if st.button(get_translation("reset_page_button", st.session_state.language)):
+        if st.button(labels.reset_page_button):
             st.session_state.page = 0
 
     # 展开面板2："RWA 资产代币化"
     with st.expander("RWA 资产代币化", expanded=False):
         st.markdown("#### 请选择资产类型")
 
-        ASSET_TYPES = {
-            "稳定币": "stablecoin",
-            "美国国债": "treasury_bonds",
-            "全球债券": "global_bonds",
-            "大宗商品": "commodities",
-            "股票": "stocks",
-            "房地产": "real_estate"
-        }
+        # 资产名称 -> 目录中的 key（目录不依赖 rwa 的重量级模块，可在侧边栏直接导入）
+        ASSET_TYPES = {asset.name: key for key, asset in RWA_CATALOG.items()}
 
         selected_asset = st.radio(
             "资产类型",
@@ -105,76 +166,206 @@ with st.sidebar:
             st.rerun()
 
 # 构造API参数
-params = {
-    "limit": str(page_size),
-    "offset": str(st.session_state.page * page_size),
-    "active": None,
-    "start_date_min": datetime.combine(start_date, datetime.min.time()).strftime("%Y-%m-%dT%H:%M:%SZ"),
-    "end_date_max": datetime.combine(end_date, datetime.max.time()).strftime("%Y-%m-%dT%H:%M:%SZ"),
-    "volume_min": str(volume_min)
-}
-
-if active_option == get_translation("active_option_active", st.session_state.language):
-    params["active"] = "true"
-elif active_option == get_translation("active_option_inactive", st.session_state.language):
-    params["active"] = "false"
+if active_option == labels.active_option_active:
+    active_param = "true"
+elif active_option == labels.active_option_inactive:
+    active_param = "false"
 else:
-    params.pop("active")
-
-params = {k: v for k, v in params.items() if v is not None}
-
-@st.cache_data(show_spinner=False)
-def fetch_events(params):
-    url = "https://gamma-api.polymarket.com/events"
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if isinstance(data, list):
-            return data
-    return []
+    active_param = None
+
+params = build_event_params(
+    page_size=page_size,
+    page=st.session_state.page,
+    active=active_param,
+    start_date=start_date,
+    end_date=end_date,
+    volume_min=volume_min
+)
 
-events = fetch_events(params)
+@st.cache_data(show_spinner=False, ttl=300)
+def fetch_all_events_cached(filter_key):
+    """按筛选条件（不含分页参数）缓存全部事件，翻页时不会重新拉取"""
+    return fetch_all_events(dict(filter_key))
+
+def sort_events(events, sort_key):
+    """本地排序：成交量从高到低，日期从早到晚"""
+    if sort_key is None:
+        return events
+    if sort_key == "volume":
+        return sorted(events, key=lambda e: float(e.get("volume") or 0), reverse=True)
+    return sorted(events, key=lambda e: e.get(sort_key) or "")
+
+@st.cache_resource(show_spinner=False, max_entries=20)
+def get_event_index(filter_key):
+    """每组筛选条件（不含分页参数）共享一个检索索引，跨页面增量更新"""
+    return EventIndex()
+
+def load_predict_market_events():
+    """预测市场视图的数据依赖：拉取事件、本地检索、排序与分页"""
+    filter_key = tuple(sorted((k, v) for k, v in params.items() if k not in ("limit", "offset")))
+    event_index = get_event_index(filter_key)
+    searching = bool(keyword.strip() or tag_query.strip())
+
+    bulk = bulk_mode
+    if bulk:
+        try:
+            all_events = fetch_all_events_cached(filter_key)
+        except ConnectionError as e:
+            # 部分页面获取失败时不展示被截断的结果，改为按页加载
+            st.warning(f"⚠️ 批量获取事件失败，已改为按页加载：{e}")
+            bulk = False
+    if not bulk:
+        all_events = fetch_events(params)
+    event_index.add_events(all_events)
+
+    if searching:
+        # 检索范围为当前筛选条件下已获取的全部事件，默认按相关度排序
+        all_events = event_index.search(keyword, tag_query)
+    all_events = sort_events(all_events, sort_options[sort_label])
+
+    if bulk or searching:
+        total_pages = max(1, -(-len(all_events) // page_size))
+        st.session_state.page = min(st.session_state.page, total_pages - 1)
+        offset = st.session_state.page * page_size
+        return all_events[offset:offset + page_size], total_pages
+    return all_events, None
 
 # ====== 显示 RWA 或预测市场内容 ======
 
-# 如果用户选择了 RWA 模块
-if st.session_state.get("view") == "rwa":
+def load_rwa_module():
+    """RWA 视图的依赖：rwa 模块（连同 Plotly、SQLAlchemy）只在进入该视图时导入"""
     try:
-        from rwa import (
-            show_stablecoin,
-            show_treasury_bonds,
-            show_global_bonds,
-            show_commodities,
-            show_stocks,
-            show_real_estate
-        )
-
-        rwa_asset = st.session_state.get("rwa_asset", "stablecoin")
-
-        if rwa_asset == "stablecoin":
-            show_stablecoin()
-        elif rwa_asset == "treasury_bonds":
-            show_treasury_bonds()
-        elif rwa_asset == "global_bonds":
-            show_global_bonds()
-        elif rwa_asset == "commodities":
-            show_commodities()
-        elif rwa_asset == "stocks":
-            show_stocks()
-        elif rwa_asset == "real_estate":
-            show_real_estate()
-
-        if st.button("返回预测市场"):
-            st.session_state.view = "predict_market"
-            st.rerun()
-
+        import rwa
+        return rwa
     except ImportError:
-        st.error("无法加载 RWA 模块，请确保 rwa.py 存在并可导入。")
+        return None
 
-# 默认显示预测市场内容
-else:
+# RWA 视图
+def show_rwa(data):
+    rwa = data["rwa"]
+    if rwa is None:
+        st.error("无法加载 RWA 模块，请确保 rwa.py 存在并可导入。")
+        return
+
+    # 所有资产类型共用目录驱动的页面
+    rwa.show_asset_type(st.session_state.get("rwa_asset", DEFAULT_ASSET_TYPE))
+
+    # 连接池与缓存状态仅管理员可见
+    if is_admin:
+        from db import get_pool_stats
+        pool_stats = get_pool_stats()
+        if pool_stats:
+            with st.expander("数据库连接池状态", expanded=False):
+                st.json(pool_stats)
+        with st.expander("RWA 数据缓存状态", expanded=False):
+            st.json(rwa.get_rwa_cache_stats())
+
+    if st.button("返回预测市场"):
+        st.session_state.view = "predict_market"
+        st.rerun()
+
+def render_market_charts(market, labels, outcomes_df):
+    """单个市场的结果价格柱状图、成交量折线图与价格历史（outcomes_df 为该市场的结果价格）"""
+    if not outcomes_df.empty:
+        outcomes_df = outcomes_df[["outcome", "price"]].rename(columns={
+            "outcome": labels.market_outcomes,
+            "price": labels.market_prices
+        })
+        st.bar_chart(outcomes_df, x=labels.market_outcomes, y=labels.market_prices)
+        for outcome, price in outcomes_df.itertuples(index=False):
+            st.write(f"- {outcome}: {price:.3f}")
+    else:
+        st.info("No outcome data available")
+    volume_data = {
+        labels.volume_24hr: market.get("volume24hr", 0),
+        labels.volume_1wk: market.get("volume1wk", 0),
+        labels.volume_1mo: market.get("volume1mo", 0),
+        labels.volume_1yr: market.get("volume1yr", 0)
+    }
+    volume_df = pd.DataFrame(list(volume_data.items()), columns=[
+        labels.time_period,
+        labels.volume
+    ])
+    st.line_chart(volume_df.set_index(labels.time_period))
+
+    # 已采集的价格历史（按区间查询本地时序表）
+    from price_history import history_enabled, history_window_start, query_price_history
+    if history_enabled() and market.get("id") is not None:
+        history_df = query_price_history(market["id"], start_ts=history_window_start())
+        if not history_df.empty:
+            st.markdown("#### " + labels.price_history)
+            st.line_chart(history_df.pivot_table(
+                index="ts", columns="outcome", values="price"
+            ))
+
+def render_market_info(market, labels):
+    """单个市场的基本信息与状态（纯文本，不含图表）"""
+    st.markdown("### " + labels.market_info)
+    st.write(f"**{labels.start_date}:** {market.get('startDate', '-')}")
+    st.write(f"**{labels.end_date}:** {market.get('endDate', '-')}")
+    st.write(f"**{labels.volume}:** {market.get('volume', '-')}")
+    status = "status_open" if market.get("closed", False) is False else "status_closed"
+    status_text = getattr(labels, status)
+    status_color = "green" if status == "status_open" else "red"
+    st.markdown(f"""
+    <div style="margin-top: 1rem; padding: 0.5rem; border-radius: 0.5rem; 
+                background-color: {'#e8f5e9' if status == 'status_open' else '#ffebee'}; 
+                color: {status_color}; text-align: center;">
+        <b>{labels.status}:</b> {status_text}
+    </div>
+    """, unsafe_allow_html=True)
+    icon_url = market.get("icon", "")
+    if icon_url:
+        st.image(icon_url, width=100, caption=labels.market_icon)
+
+def render_markets_consolidated(markets, labels):
+    """
+    合并展示：用一张长表（全部市场的结果价格与各周期成交量）派生
+    一张分面柱状图（价格 / 成交量）和一张汇总表，元素数量不随市场数量增长。
+    """
+    import plotly.express as px
+
+    detail_df = market_detail_frame(markets)
+    if detail_df.empty:
+        st.info(labels.no_market_data)
+        return
+
+    period_labels = {field: getattr(labels, key) for field, key in VOLUME_PERIODS.items()}
+    is_volume = detail_df["metric"] == "volume"
+    detail_df["series"] = detail_df["series"].where(~is_volume, detail_df["series"].map(period_labels))
+    detail_df["metric"] = detail_df["metric"].map({
+        "price": labels.market_prices,
+        "volume": labels.volume
+    })
+
+    with span("px.bar", rows=len(detail_df)):
+        fig = px.bar(
+            detail_df, x="value", y="question", color="series", facet_col="metric",
+            orientation="h", barmode="group",
+            height=max(320, 40 * len(markets) + 120),
+            labels={"value": "", "question": "", "series": "", "metric": ""}
+        )
+        fig.update_xaxes(matches=None)
+        fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # 汇总表：每个市场一行，各结果价格与各周期成交量为列
+    table = detail_df.pivot_table(index="market_index", columns="series", values="value",
+                                  aggfunc="first", sort=False).reindex(range(len(markets)))
+    table.columns.name = None
+    table.insert(0, labels.market_question, [m.get("question") or "" for m in markets])
+    table[labels.status] = [
+        labels.status_closed if m.get("closed") else labels.status_open
+        for m in markets
+    ]
+    st.dataframe(table, hide_index=True)
+
+# 预测市场视图（默认）
+def show_predict_market(data):
+    events, total_pages = data["events"]
     if not events:
-        st.warning(get_translation("no_events_found", st.session_state.language))
+        st.warning(labels.no_events_found)
     else:
         def safe_get(event, keys):
             for key in keys:
@@ -182,93 +373,119 @@ else:
                     return event[key]
             return ""
 
-        rows = []
-        for e in events:
-            row = {
-                get_translation("title", st.session_state.language): safe_get(e, ["title"]),
-                get_translation("start_date", st.session_state.language): safe_get(e, ["startDate"]),
-                get_translation("end_date", st.session_state.language): safe_get(e, ["endDate"]),
-                get_translation("volume", st.session_state.language): safe_get(e, ["volume"])
-            }
-            rows.append(row)
-
-        df = pd.DataFrame(rows)
+        # 一次性展开为带类型的表格，列名整体翻译
+        df = translate_columns(events_to_frame(events), EVENT_COLUMNS, st.session_state.language)
         st.dataframe(df)
+        events_age = get_events_age(params)
+        if events_age is not None and not bulk_mode:
+            st.caption(f"数据更新于 {int(events_age)} 秒前")
+
+        # 翻页控件
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button(labels.previous_page,
+                         disabled=st.session_state.page == 0):
+                st.session_state.page -= 1
+                st.rerun()
+        with col_page:
+            page_label = f"{labels.current_page} {st.session_state.page + 1}"
+            if total_pages is not None:
+                page_label += f" / {total_pages}"
+            st.write(page_label)
+        with col_next:
+            has_next = (st.session_state.page + 1 < total_pages) if total_pages is not None \
+                else len(events) >= page_size
+            if st.button(labels.next_page,
+                         disabled=not has_next):
+                st.session_state.page += 1
+                st.rerun()
 
         # 选择事件进行详情查看
-        st.subheader(get_translation("select_event", st.session_state.language))
+        st.subheader(labels.select_event)
         slug_list = [e.get("slug", "") for e in events]
         selected_slug = st.selectbox(
-            get_translation("select_event_slug", st.session_state.language),
+            labels.select_event_slug,
             slug_list
         )
 
+        # 后台预取本页其他事件的详情
+        prefetch_event_details(events)
+
         if selected_slug:
-            detail_url = "https://gamma-api.polymarket.com/events"
-            detail_params = {"slug": selected_slug}
-            detail_resp = requests.get(detail_url, params=detail_params)
-            detail_data = detail_resp.json()
-            if isinstance(detail_data, list) and len(detail_data) > 0:
-                event = detail_data[0]
+            event = resolve_event_detail(selected_slug, events)
+            if event:
                 st.markdown(f"### {event['title']}")
                 if event.get("image"):
                     st.image(event["image"], width=300)
-                st.write(f"**{get_translation('description', st.session_state.language)}：** {event.get('description', '')}")
-                st.write(f"**{get_translation('category', st.session_state.language)}：** {safe_get(event, ['category', 'categories'])}")
-                st.write(f"**{get_translation('start_date', st.session_state.language)}：** {event.get('startDate', '')}")
-                st.write(f"**{get_translation('end_date', st.session_state.language)}：** {event.get('endDate', '')}")
-                st.write(f"**{get_translation('volume', st.session_state.language)}：** {event.get('volume', '')}")
+                st.write(f"**{labels.description}：** {event.get('description', '')}")
+                st.write(f"**{labels.category}：** {safe_get(event, ['category', 'categories'])}")
+                st.write(f"**{labels.start_date}：** {event.get('startDate', '')}")
+                st.write(f"**{labels.end_date}：** {event.get('endDate', '')}")
+                st.write(f"**{labels.volume}：** {event.get('volume', '')}")
                 tags = event.get("tags", [])
                 if tags:
-                    st.write(f"**{get_translation('tags', st.session_state.language)}：** " + ", ".join([tag.get("label", "") for tag in tags]))
+                    st.write(f"**{labels.tags}：** " + ", ".join([tag.get("label", "") for tag in tags]))
                 markets = event.get("markets", [])
                 if markets:
-                    def render_market_data(market, lang):
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            outcomes = eval(market.get("outcomes", "[]"))
-                            prices = eval(market.get("outcomePrices", "[]"))
-                            if outcomes and prices:
-                                outcomes_df = pd.DataFrame({
-                                    get_translation("market_outcomes", lang): outcomes,
-                                    get_translation("market_prices", lang): [float(p) for p in prices]
-                                })
-                                st.bar_chart(outcomes_df, x=get_translation("market_outcomes", lang), y=get_translation("market_prices", lang))
-                                for outcome, price in zip(outcomes, prices):
-                                    st.write(f"- {outcome}: {float(price):.3f}")
-                            else:
-                                st.info("No outcome data available")
-                            volume_data = {
-                                get_translation("volume_24hr", lang): market.get("volume24hr", 0),
-                                get_translation("volume_1wk", lang): market.get("volume1wk", 0),
-                                get_translation("volume_1mo", lang): market.get("volume1mo", 0),
-                                get_translation("volume_1yr", lang): market.get("volume1yr", 0)
-                            }
-                            volume_df = pd.DataFrame(list(volume_data.items()), columns=[
-                                get_translation("time_period", lang),
-                                get_translation("volume", lang)
-                            ])
-                            st.line_chart(volume_df.set_index(get_translation("time_period", lang)))
-                        with col2:
-                            st.markdown("### " + get_translation("market_info", lang))
-                            st.write(f"**{get_translation('start_date', lang)}:** {market.get('startDate', '-')}")
-                            st.write(f"**{get_translation('end_date', lang)}:** {market.get('endDate', '-')}")
-                            st.write(f"**{get_translation('volume', lang)}:** {market.get('volume', '-')}")
-                            status = "status_open" if market.get("closed", False) is False else "status_closed"
-                            status_text = get_translation(status, lang)
-                            status_color = "green" if status == "status_open" else "red"
-                            st.markdown(f"""
-                            <div style="margin-top: 1rem; padding: 0.5rem; border-radius: 0.5rem; 
-                                        background-color: {'#e8f5e9' if status == 'status_open' else '#ffebee'}; 
-                                        color: {status_color}; text-align: center;">
-                                <b>{get_translation('status', lang)}:</b> {status_text}
-                            </div>
-                            """, unsafe_allow_html=True)
-                            icon_url = market.get("icon", "")
-                            if icon_url:
-                                st.image(icon_url, width=100, caption=get_translation("market_icon", lang))
-                    for idx, market in enumerate(markets):
-                        with st.expander(market.get("question", f"{get_translation('market', st.session_state.language)} {idx+1}")):
-                            render_market_data(market, st.session_state.language)
+                    # 整个事件的结果价格只解析一次，各市场的图表取其中对应的行
+                    outcomes_df = outcomes_to_frame(markets)
+                    consolidated = st.toggle(labels.consolidated_detail_label,
+                                             value=True, key="consolidated_detail")
+                    if consolidated:
+                        # 全部市场合并为一张图与一张表，单个市场的图表在展开并勾选后才绘制
+                        render_markets_consolidated(markets, labels)
+                        for idx, market in enumerate(markets):
+                            with st.expander(market.get("question", f"{labels.market} {idx+1}")):
+                                render_market_info(market, labels)
+                                if st.checkbox(labels.show_market_charts,
+                                               key=f"market_charts_{market.get('id', idx)}"):
+                                    render_market_charts(market, labels,
+                                                         outcomes_df[outcomes_df["market_index"] == idx])
+                    else:
+                        for idx, market in enumerate(markets):
+                            with st.expander(market.get("question", f"{labels.market} {idx+1}")):
+                                col1, col2 = st.columns([3, 1])
+                                with col1:
+                                    render_market_charts(market, labels,
+                                                         outcomes_df[outcomes_df["market_index"] == idx])
+                                with col2:
+                                    render_market_info(market, labels)
             else:
-                st.error("No event found with this slug.")
\ No newline at end of file
+                st.error("No event found with this slug.")
+
+    # 请求统计与后台刷新状态（含原始错误信息）仅管理员可见
+    if is_admin:
+        with st.expander("Gamma API 请求统计", expanded=False):
+            st.json(get_http_stats())
+            st.json({"events": get_events_cache_stats(), "detail": get_detail_cache_stats()})
+            st.json(get_refresher_status())
+
+
+# ====== 按当前视图分发：只执行该视图声明的数据加载 ======
+register_view("predict_market", show_predict_market,
+              loaders={"events": load_predict_market_events}, default=True)
+register_view("rwa", show_rwa, loaders={"rwa": load_rwa_module})
+
+try:
+    dispatch(st.session_state.get("view", "predict_market"))
+
+    # 首屏渲染后在后台预热重量级模块，首次进入 RWA 视图时无需等待导入
+    warm_modules(["rwa"])
+finally:
+    # 视图中途中断（异常、st.stop、st.rerun）时也结束 trace：
+    # tracemalloc 对整个进程生效，不能在中断后一直开启
+    trace = end_trace()
+
+# ====== 性能面板（仅管理员可见） ======
+if is_admin and trace is not None:
+    with st.sidebar.expander("⏱️ 性能面板", expanded=False):
+        st.metric("本次运行耗时 (ms)", trace.total_ms)
+        if trace.spans:
+            spans_df = pd.DataFrame(trace.spans)
+            spans_df["name"] = ["  " * d + n for d, n in zip(spans_df["depth"], spans_df["name"])]
+            st.dataframe(spans_df.drop(columns=["depth"]), hide_index=True)
+        if trace.profile:
+            st.code(trace.profile)
+        st.selectbox("下次运行的 profile", options=[None, *PROFILE_MODES], key="profile_mode")
+        st.markdown("**进程累计（最近 500 次）**")
+        st.json(get_span_stats())
@@ -0,0 +1,274 @@
+# bench.py
+# 数据路径基准测试：不依赖外网，使用本地 HTTP 桩服务模拟 gamma API、
+# 使用 SQLite（或本地 Postgres）中生成的宽表模拟 RWA 数据。
+#
+# 用法：
+#   python bench.py                                  # 默认规模
+#   python bench.py --rows 5000 --assets 80 --runs 30
+#   python bench.py --db-url postgresql://localhost/bench
+#   python bench.py --json bench_output.json --baseline baseline.json --max-regression 0.2
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+BENCH_TABLE = "rwa_bench_代币"
+
+
+# ====== 合成数据 ======
+
+def make_events(count, markets_per_event=5, seed=42):
+    """生成结构与 gamma API /events 一致的合成事件列表"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        markets = []
+        for j in range(markets_per_event):
+            yes = round(rng.random(), 3)
+            markets.append({
+                "id": f"{i}-{j}",
+                "question": f"Synthetic market {i}-{j}?",
+                "outcomes": json.dumps(["Yes", "No"]),
+                "outcomePrices": json.dumps([str(yes), str(round(1 - yes, 3))]),
+                "volume": str(rng.randint(1000, 10 ** 7)),
+                "volume24hr": rng.random() * 1e5,
+                "volume1wk": rng.random() * 1e6,
+                "volume1mo": rng.random() * 1e7,
+                "volume1yr": rng.random() * 1e8,
+                "liquidity": str(rng.random() * 1e6),
+                "startDate": "2024-10-01T00:00:00Z",
+                "endDate": "2025-06-30T00:00:00Z",
+                "closed": rng.random() < 0.2
+            })
+        events.append({
+            "id": str(i),
+            "slug": f"synthetic-event-{i}",
+            "title": f"Synthetic event {i}",
+            "description": "Synthetic event used for benchmarks. " * 5,
+            "startDate": "2024-10-01T00:00:00Z",
+            "endDate": "2025-06-30T00:00:00Z",
+            "volume": str(rng.randint(10 ** 6, 10 ** 8)),
+            "tags": [{"label": rng.choice(["Crypto", "Politics", "Sports", "Economy"])}],
+            "markets": markets
+        })
+    return events
+
+
+def start_gamma_stub(events):
+    """在后台线程启动本地 gamma API 桩服务，返回 (server, base_url)"""
+    by_slug = {e["slug"]: e for e in events}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            if "slug" in query:
+                event = by_slug.get(query["slug"][0])
+                data = [event] if event else []
+            else:
+                offset = int(query.get("offset", ["0"])[0])
+                limit = int(query.get("limit", ["20"])[0])
+                data = events[offset:offset + limit]
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def create_rwa_table(engine, rows, assets, seed=42):
+    """在数据库中生成 rows 行 × assets 个资产列的宽表（Timestamp 为毫秒）"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2015-01-01", periods=rows, freq="D").as_unit("ms").astype("int64")
+    data = {"Timestamp": timestamps}
+    for i in range(assets):
+        data[f"链{i}_USD{i % 7}"] = rng.random(rows) * 1e8
+    pd.DataFrame(data).to_sql(BENCH_TABLE, engine, if_exists="replace", index=False)
+
+
+# ====== 计时 ======
+
+def measure(fn, runs, warmup=1):
+    """
+    运行 fn 多次，返回 p50/p95 延迟（毫秒）、吞吐量与峰值内存（MB）。
+    延迟在未开启 tracemalloc 时测量（追踪内存分配会显著拖慢执行），
+    峰值内存随后单独运行一次测量。
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(round(q * (len(latencies) - 1))))] * 1000
+
+    return {
+        "p50_ms": round(pct(0.5), 2),
+        "p95_ms": round(pct(0.95), 2),
+        "ops_per_s": round(runs / elapsed, 1) if elapsed else None,
+        "peak_mb": round(peak / 1024 / 1024, 2)
+    }
+
+
+# ====== 基准路径 ======
+
+def build_paths(args, events):
+    """返回 {路径名称: 无参函数}；模块在环境变量设置完成后才导入"""
+    import plotly.express as px
+    import http_client
+    import polymarket
+    import rwa
+    from normalize import events_to_frame
+
+    params = polymarket.build_event_params(page_size=args.page_size)
+    slugs = [e["slug"] for e in events[:args.page_size]]
+    asset_columns = rwa.list_rwa_numeric_columns(BENCH_TABLE)[:args.selected]
+    query = f"SELECT * FROM {BENCH_TABLE};"
+
+    def fetch_events():
+        polymarket.fetch_events_page(params)
+
+    def fetch_detail():
+        http_client.gamma_get("/events", params={"slug": random.choice(slugs)})
+
+    def events_table():
+        events_to_frame(polymarket.fetch_events_page(params))
+
+    def load_and_melt():
+        df = rwa.parse_rwa_dates(rwa.load_rwa_data(query, use_cache=False))
+        df.melt(id_vars=["Date"], value_vars=asset_columns,
+                var_name="Chain_Asset", value_name="Value")
+
+    def load_series():
+        # 清空共享缓存后走完整的按列读取 + 聚合 + 降采样流程
+        rwa.clear_rwa_cache()
+        rwa.load_rwa_series(BENCH_TABLE, asset_columns, "日",
+                            max_points=rwa.MAX_POINTS_PER_SERIES)
+
+    series = rwa.load_rwa_series(BENCH_TABLE, asset_columns, "日",
+                                 max_points=rwa.MAX_POINTS_PER_SERIES)
+    long_df = rwa.parse_rwa_dates(rwa.load_rwa_data(query)).melt(
+        id_vars=["Date"], value_vars=asset_columns, var_name="Chain_Asset", value_name="Value")
+
+    def plotly_full():
+        px.line(long_df, x="Date", y="Value", color="Chain_Asset").to_json()
+
+    def plotly_downsampled():
+        px.line(series, x="Date", y="Value", color="Chain_Asset").to_json()
+
+    return {
+        "fetch_events": fetch_events,
+        "fetch_event_detail": fetch_detail,
+        "events_to_frame": events_table,
+        "load_rwa_data+melt": load_and_melt,
+        "load_rwa_series": load_series,
+        "plotly_figure_full": plotly_full,
+        "plotly_figure_downsampled": plotly_downsampled
+    }
+
+
+def compare_with_baseline(results, baseline_path, max_regression):
+    """与基线结果比较 p95，超过允许的退化比例时返回失败的路径列表"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    failures = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base and base["p95_ms"] > 0 and result["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="数据路径基准测试（无需外网）")
+    parser.add_argument("--events", type=int, default=500, help="合成事件数量")
+    parser.add_argument("--markets", type=int, default=5, help="每个事件的市场数量")
+    parser.add_argument("--page-size", type=int, default=20, help="事件列表每页数量")
+    parser.add_argument("--rows", type=int, default=2000, help="RWA 宽表行数（天数）")
+    parser.add_argument("--assets", type=int, default=50, help="RWA 宽表资产列数")
+    parser.add_argument("--selected", type=int, default=10, help="绘图时选择的资产数")
+    parser.add_argument("--runs", type=int, default=20, help="每个路径的运行次数")
+    parser.add_argument("--db-url", help="数据库地址（默认使用临时 SQLite 文件）")
+    parser.add_argument("--only", nargs="*", help="只运行指定的路径")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="基线结果 JSON，用于检测性能退化")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="允许的 p95 退化比例（默认 0.25）")
+    args = parser.parse_args(argv)
+
+    events = make_events(args.events, args.markets)
+    server, base_url = start_gamma_stub(events)
+
+    tmp_dir = tempfile.mkdtemp(prefix="rwa_bench_")
+    db_url = args.db_url or f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+    # 必须在导入项目模块之前设置，确保所有请求都指向本地桩服务与基准数据库
+    os.environ["GAMMA_API_BASE"] = base_url
+    os.environ["DATABASE_URL"] = db_url
+    os.environ.setdefault("REFRESH_INTERVAL", "0")
+    os.environ.pop("RWA_SNAPSHOT_DIR", None)
+
+    from db import get_db_engine
+    create_rwa_table(get_db_engine(), args.rows, args.assets)
+
+    paths = build_paths(args, events)
+    if args.only:
+        paths = {name: fn for name, fn in paths.items() if name in args.only}
+
+    results = {}
+    print(f"{'path':<28}{'p50 ms':>10}{'p95 ms':>10}{'ops/s':>10}{'peak MB':>10}")
+    for name, fn in paths.items():
+        result = measure(fn, args.runs)
+        results[name] = result
+        print(f"{name:<28}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+              f"{result['ops_per_s']:>10}{result['peak_mb']:>10}")
+
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        failures = compare_with_baseline(results, args.baseline, args.max_regression)
+        if failures:
+            print("❌ 性能退化：\n" + "\n".join(failures))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# cache.py
+# 进程级共享缓存（所有 Streamlit 会话共用），支持 TTL、内存上限与 LRU 淘汰
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """估算缓存对象占用的字节数（DataFrame 按实际内存计算）"""
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            return int(memory_usage(deep=True).sum())
+        except TypeError:
+            pass
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return 0
+
+
+class CacheEntry:
+    """单条缓存记录"""
+
+    __slots__ = ("value", "size", "stored_at", "fingerprint")
+
+    def __init__(self, value, size, fingerprint=None):
+        self.value = value
+        self.size = size
+        self.stored_at = time.monotonic()
+        self.fingerprint = fingerprint
+
+    def age(self):
+        """距离上次写入或校验的秒数"""
+        return time.monotonic() - self.stored_at
+
+
+class TTLCache:
+    """
+    线程安全的 TTL + LRU 缓存。
+    - ttl：条目有效期（秒），过期后 get 视为未命中，但条目保留以便用指纹做廉价校验
+    - max_bytes：总内存上限，超出时按最近最少使用顺序淘汰
+    - sizeof：计算条目大小的函数
+    - max_entries：条目数上限（None 表示不限），用于 sizeof 无法估算大小的对象（列表、字典）
+    - max_stale：过期条目最多再保留的秒数（None 表示一直保留以便指纹校验）；
+      不做指纹校验的缓存应设置该值，写入时顺带清理
+    """
+
+    def __init__(self, ttl=300, max_bytes=256 * 1024 * 1024, sizeof=estimate_size,
+                 max_entries=None, max_stale=None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._purged_at = time.monotonic()
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """返回未过期的缓存值；不存在或已过期时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.age() > self.ttl:
+                self.misses += 1
+                if entry is not None and self.max_stale is not None \
+                        and entry.age() > self.ttl + self.max_stale:
+                    self._bytes -= self._entries.pop(key).size
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def peek(self, key):
+        """返回缓存条目（即使已过期），不影响命中统计"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_fresh(self, key):
+        """判断条目是否存在且未过期，不影响命中统计"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.age() <= self.ttl
+
+    def touch(self, key):
+        """
+        指纹校验通过后刷新条目的写入时间，只计入 revalidations（不改动命中/未命中计数）。
+        返回条目是否仍在缓存中（可能已在校验期间被淘汰）。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry.stored_at = time.monotonic()
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+            return True
+
+    def set(self, key, value, fingerprint=None):
+        """写入缓存并在超出内存上限时淘汰最久未使用的条目"""
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if size > self.max_bytes:
+                # 单个对象超过总上限时不缓存
+                return value
+            self._entries[key] = CacheEntry(value, size, fingerprint)
+            self._bytes += size
+            self._purge_stale()
+            while self._entries and (
+                    self._bytes > self.max_bytes
+                    or (self.max_entries is not None and len(self._entries) > self.max_entries)):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+        return value
+
+    def _purge_stale(self):
+        """删除过期超过 max_stale 秒的条目（每个 TTL 周期最多扫描一次，调用方需持有锁）"""
+        if self.max_stale is None or time.monotonic() - self._purged_at < self.ttl:
+            return
+        self._purged_at = time.monotonic()
+        limit = self.ttl + self.max_stale
+        for key in [k for k, entry in self._entries.items() if entry.age() > limit]:
+            self._bytes -= self._entries.pop(key).size
+
+    def invalidate(self, key=None):
+        """删除指定条目；不传 key 时清空全部缓存"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def stats(self):
+        """返回命中率、条目数、占用内存等统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class _Call:
+    """一次进行中的加载：等待者阻塞在 done 上，完成后读取 result / error"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    请求合并（single-flight）：同一 key 同时只执行一次加载，
+    并发的相同请求等待这次加载完成并共享其结果（或异常）。
+    用于缓存过期瞬间避免多个会话同时请求 API 或数据库。
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, loader):
+        """执行 loader() 并返回结果；已有相同 key 的加载在进行时直接等待其结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = loader()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """返回实际执行次数、被合并的请求数与当前进行中的加载数"""
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "shared": self.shared,
+                "in_flight": len(self._calls)
+            }
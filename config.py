@@ -0,0 +1,20 @@
+# config.py
+# 轻量配置读取：只依赖 python-dotenv，供不需要数据库的模块（gamma API 客户端、预测市场页面）使用，
+# 避免为了读取一个整数配置而导入 SQLAlchemy。
+
+import os
+from dotenv import load_dotenv
+
+# .env 只在导入时读取一次（get_env_int 在每次页面运行中会被多次调用）
+load_dotenv()
+
+
+def get_env_int(name, default):
+    """读取整数型环境变量（含 .env 中的配置），未设置时使用默认值"""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"环境变量 {name} 必须是整数，当前值为：{value}")
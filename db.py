@@ -1,34 +1,92 @@
 # db.py
 
 import os
+import threading
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
+from instrumentation import timed
+from config import get_env_int
 
+# 进程级共享引擎（所有 Streamlit 会话复用同一个连接池）
+_engine = None
+_engine_lock = threading.Lock()
+
+
+@timed("db.get_db_engine")
 def get_db_engine():
     """
-    从 .env 加载 DATABASE_URL，并创建数据库引擎。
-    成功连接后返回 engine。
+    从 .env 加载 DATABASE_URL，并返回进程内共享的数据库引擎。
+    首次调用时创建引擎，之后的调用直接复用同一个连接池。
+
+    连接池参数可通过环境变量配置：
+    - DB_POOL_SIZE：常驻连接数（默认 5）
+    - DB_MAX_OVERFLOW：允许临时超出的连接数（默认 10）
+    - DB_POOL_RECYCLE：连接回收时间，单位秒（默认 1800）
+    - DB_POOL_TIMEOUT：获取连接的等待超时，单位秒（默认 30）
     """
-    # 加载 .env 文件中的环境变量
-    load_dotenv()
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        # 双重检查，避免并发会话重复创建引擎
+        if _engine is not None:
+            return _engine
+
+        # 加载 .env 文件中的环境变量
+        load_dotenv()
+
+        # 获取 DATABASE_URL
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            raise ValueError("DATABASE_URL 未在 .env 文件中找到，请检查配置。")
 
-    # 获取 DATABASE_URL
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise ValueError("DATABASE_URL 未在 .env 文件中找到，请检查配置。")
+        pool_options = {}
+        # SQLite 使用单独的连接池实现，不支持 QueuePool 参数
+        if not db_url.startswith("sqlite"):
+            pool_options = {
+                "pool_size": get_env_int("DB_POOL_SIZE", 5),
+                "max_overflow": get_env_int("DB_MAX_OVERFLOW", 10),
+                "pool_recycle": get_env_int("DB_POOL_RECYCLE", 1800),
+                "pool_timeout": get_env_int("DB_POOL_TIMEOUT", 30),
+            }
 
-    try:
-        # 创建数据库引擎
-        engine = create_engine(db_url)
+        try:
+            # 创建数据库引擎；pool_pre_ping 在取出连接时检测其是否仍然可用，
+            # 代替每次创建引擎后立即执行 SELECT 1
+            _engine = create_engine(db_url, pool_pre_ping=True, **pool_options)
+        except SQLAlchemyError as e:
+            error_msg = f"❌ 数据库连接失败：{str(e)}"
+            raise ConnectionError(error_msg)
+
+        print("✅ 数据库引擎已创建（连接池复用）")
+        return _engine
+
+
+def get_pool_stats():
+    """
+    返回共享连接池的当前状态，便于在页面上展示。
+    引擎尚未创建时返回 None。
+    """
+    engine = _engine
+    if engine is None:
+        return None
 
-        # 测试连接是否可用
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))  # 使用 text 包裹原生 SQL
+    pool = engine.pool
+    stats = {"status": pool.status()}
+    # QueuePool 提供以下计数方法，其他连接池类型可能没有
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
 
-        print("✅ 数据库连接成功！")
-        return engine
 
-    except SQLAlchemyError as e:
-        error_msg = f"❌ 数据库连接失败：{str(e)}"
-        raise ConnectionError(error_msg)
\ No newline at end of file
+def dispose_db_engine():
+    """关闭共享引擎的所有连接（例如在配置变更或测试后重置）"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
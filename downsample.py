@@ -0,0 +1,84 @@
+# downsample.py
+# 绘图前的降采样：按日/周/月聚合宽表，以及折线图的 LTTB 点数上限
+
+import numpy as np
+import pandas as pd
+
+# 时间粒度选项 -> pandas 频率
+GRANULARITIES = {
+    "日": "D",
+    "周": "W",
+    "月": "ME"
+}
+
+
+def resample_frame(df, granularity="日", time_column="Date"):
+    """
+    将宽表按时间粒度聚合，每个时间段取最后一个值（适用于市值、余额等存量数据）。
+    在转换为长格式之前执行，计算完全向量化。
+    """
+    freq = GRANULARITIES.get(granularity, "D")
+    if freq == "D" or df.empty:
+        return df
+    return (
+        df.set_index(time_column)
+          .sort_index()
+          .resample(freq)
+          .last()
+          .dropna(how="all")
+          .reset_index()
+    )
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标。
+    保留首尾两点，其余每个桶中选出与相邻桶构成三角形面积最大的点，
+    能在大幅减少点数的同时保留曲线的峰谷形状。
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # 除首尾点外分成 threshold - 2 个桶
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+
+    return indices
+
+
+def downsample_long(df, x, y, group, max_points=1000):
+    """对长格式数据按 group 分组，每个序列最多保留 max_points 个点"""
+    if df.empty:
+        return df
+
+    parts = []
+    for _, series in df.groupby(group, sort=False):
+        series = series.sort_values(x)
+        if len(series) > max_points:
+            x_values = series[x]
+            if pd.api.types.is_datetime64_any_dtype(x_values):
+                x_values = x_values.astype("int64")
+            series = series.iloc[lttb_indices(x_values.to_numpy(), series[y].to_numpy(), max_points)]
+        parts.append(series)
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,162 @@
+# http_client.py
+# Polymarket gamma API 的共享 HTTP 客户端：连接池 + keep-alive + HTTP/2 + 超时 + 重试
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+import httpx
+from config import get_env_int
+
+# 可通过环境变量指向本地桩服务（测试、压测时使用）
+GAMMA_API_BASE = os.getenv("GAMMA_API_BASE", "https://gamma-api.polymarket.com")
+
+# 需要重试的状态码（限流与服务端错误）
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client = None
+_client_lock = threading.Lock()
+
+# 最近请求的耗时记录（秒），用于统计延迟
+_latencies = deque(maxlen=500)
+_metrics_lock = threading.Lock()
+_counters = {"requests": 0, "retries": 0, "errors": 0}
+
+
+def _http2_available():
+    """HTTP/2 需要安装 h2 包"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _client_options():
+    """同步与异步客户端共用的连接参数"""
+    return {
+        "base_url": GAMMA_API_BASE,
+        "http2": _http2_available(),
+        "timeout": httpx.Timeout(
+            get_env_int("GAMMA_READ_TIMEOUT", 15),
+            connect=get_env_int("GAMMA_CONNECT_TIMEOUT", 5)
+        ),
+        "limits": httpx.Limits(
+            max_connections=get_env_int("GAMMA_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=get_env_int("GAMMA_MAX_KEEPALIVE", 10)
+        )
+    }
+
+
+def get_http_client():
+    """返回进程内共享的 httpx 客户端（所有会话复用连接池）"""
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(**_client_options())
+        return _client
+
+
+def _record(elapsed, retries=0, error=False):
+    with _metrics_lock:
+        _latencies.append(elapsed)
+        _counters["requests"] += 1
+        _counters["retries"] += retries
+        if error:
+            _counters["errors"] += 1
+
+
+def _retry_delay(started, attempt, max_retries, backoff, response=None):
+    """
+    判断一次请求是否需要重试：需要时返回等待秒数（指数退避，429 带 Retry-After 时按其等待，
+    最长 GAMMA_MAX_RETRY_DELAY 秒）；
+    不再重试时记录统计并返回 None。response 为 None 表示网络错误。
+    """
+    if response is None:
+        if attempt >= max_retries:
+            _record(time.perf_counter() - started, attempt, error=True)
+            return None
+        return backoff * (2 ** attempt)
+
+    if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+        _record(time.perf_counter() - started, attempt, error=response.status_code >= 400)
+        return None
+    delay = backoff * (2 ** attempt)
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, int(retry_after))
+    # 服务端可能返回很长的 Retry-After，等待时间不超过 GAMMA_MAX_RETRY_DELAY 秒
+    return min(delay, get_env_int("GAMMA_MAX_RETRY_DELAY", 30))
+
+
+def gamma_get(path, params=None, max_retries=3, backoff=0.5):
+    """
+    向 gamma API 发送 GET 请求，遇到 429/5xx 或网络错误时按指数退避重试。
+    429 响应带 Retry-After 时按其等待。返回最终的 httpx.Response；
+    重试用尽仍是网络错误时抛出 httpx.HTTPError。
+    """
+    client = get_http_client()
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = client.get(path, params=params)
+        except httpx.TransportError:
+            delay = _retry_delay(started, attempt, max_retries, backoff)
+            if delay is None:
+                raise
+        else:
+            delay = _retry_delay(started, attempt, max_retries, backoff, response)
+            if delay is None:
+                return response
+        attempt += 1
+        time.sleep(delay)
+
+
+def make_async_client():
+    """
+    创建异步客户端（与同步客户端使用相同的超时与 HTTP/2 设置）。
+    异步客户端绑定在事件循环上，因此每次 asyncio.run 都需要新建。
+    """
+    return httpx.AsyncClient(**_client_options())
+
+
+async def gamma_get_async(client, path, params=None, max_retries=3, backoff=0.5):
+    """gamma_get 的异步版本，重试与统计规则相同"""
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = await client.get(path, params=params)
+        except httpx.TransportError:
+            delay = _retry_delay(started, attempt, max_retries, backoff)
+            if delay is None:
+                raise
+        else:
+            delay = _retry_delay(started, attempt, max_retries, backoff, response)
+            if delay is None:
+                return response
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def get_http_stats():
+    """返回请求数、重试数、错误数及 p50/p95/最近一次延迟（毫秒）"""
+    with _metrics_lock:
+        latencies = list(_latencies)
+        stats = dict(_counters)
+    if latencies:
+        ordered = sorted(latencies)
+        stats["p50_ms"] = round(_percentile(ordered, 0.5) * 1000, 1)
+        stats["p95_ms"] = round(_percentile(ordered, 0.95) * 1000, 1)
+        stats["last_ms"] = round(latencies[-1] * 1000, 1)
+    return stats
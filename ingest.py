@@ -0,0 +1,294 @@
+# ingest.py
+# RWA 源数据批量导入：流式读取 CSV / JSON 导出文件，按块批量写入宽表。
+# Postgres 使用 COPY（upsert 时先 COPY 到临时表再 INSERT ... ON CONFLICT），
+# 其他数据库（如本地 SQLite）使用批量 executemany。
+#
+# 用法：
+#   python ingest.py data/rwa_稳定币_代币.csv
+#   python ingest.py export.jsonl --table rwa_美国国债_代币 --mode upsert
+#   python ingest.py a.csv b.csv --table rwa_稳定币_代币 --db-url sqlite:///local.db
+#
+# 导入模式：
+# - append：直接追加（默认）
+# - upsert：时间列相同的行覆盖旧值（时间列需唯一）
+# - replace：删除旧表后重建
+# 表不存在时按第一块数据的类型建表；文件中出现新列（如新增的链）时自动加列。
+# 每次导入都会记录到 ingest_log 表（见 ingest_log.py）；追加的数据早于表中已有的
+# 最大时间戳时记为 backfill。页面的增量同步发现表有新的 upsert / replace / backfill 记录时
+# 会重新全量读取该表，无需重启。直接写库（不经过本命令）修改历史行时需要重启应用。
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import pandas as pd
+from sqlalchemy import (
+    MetaData, Table, Column, BigInteger, Double, Text, inspect, insert, text
+)
+from sqlalchemy.exc import SQLAlchemyError
+from config import get_env_int
+from db import get_db_engine
+from ingest_log import record_ingest
+
+DEFAULT_CHUNKSIZE = get_env_int("INGEST_CHUNKSIZE", 50000)
+INGEST_MODES = ("append", "upsert", "replace")
+
+# ====== 读取 ======
+
+def read_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    按块读取导出文件，返回 DataFrame 迭代器：
+    .csv 与 .jsonl/.ndjson 流式读取；.json（顶层为数组）需整体解析后再分块。
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(path, chunksize=chunksize)
+    if ext in (".jsonl", ".ndjson"):
+        return pd.read_json(path, lines=True, chunksize=chunksize)
+    if ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            raise ValueError(f"{path} 的顶层必须是数组")
+        return (pd.DataFrame.from_records(records[i:i + chunksize])
+                for i in range(0, len(records), chunksize))
+    raise ValueError(f"不支持的文件格式：{path}（仅支持 .csv / .json / .jsonl）")
+
+
+def normalize_time_column(df, time_column):
+    """Timestamp 列统一为 UTC 毫秒整数（源文件可能是 ISO 时间字符串或秒）"""
+    if time_column != "Timestamp" or time_column not in df.columns:
+        return df
+    values = df[time_column]
+    if pd.api.types.is_numeric_dtype(values):
+        # 秒级时间戳（10 位）转换为毫秒
+        if values.dropna().lt(10 ** 11).all():
+            values = values * 1000
+        df[time_column] = values.astype("int64")
+    else:
+        parsed = pd.to_datetime(values, utc=True)
+        df[time_column] = parsed.dt.tz_localize(None).astype("datetime64[ms]").astype("int64")
+    return df
+
+
+# ====== 建表与索引 ======
+
+def _column_type(name, dtype, time_column="Timestamp"):
+    """
+    列的 SQL 类型：毫秒时间列为 BIGINT，数值列一律为双精度浮点
+    （第一块中恰好都是整数的列，后续块仍可能出现小数），其余为文本
+    """
+    if name == time_column and pd.api.types.is_integer_dtype(dtype):
+        return BigInteger()
+    if pd.api.types.is_numeric_dtype(dtype):
+        return Double()
+    return Text()
+
+
+def ensure_table(engine, table, df, time_column="Timestamp", unique=False):
+    """
+    确保目标表存在且包含 df 的全部列：不存在时建表，缺少的列用 ALTER TABLE 补上。
+    同时在时间列上建索引（upsert 需要唯一索引）。返回反射后的 Table。
+    """
+    metadata = MetaData()
+    existing = inspect(engine)
+    if not existing.has_table(table):
+        columns = [Column(name, _column_type(name, dtype, time_column))
+                   for name, dtype in df.dtypes.items()]
+        Table(table, metadata, *columns)
+        metadata.create_all(engine)
+    else:
+        known = {c["name"] for c in existing.get_columns(table)}
+        missing = [name for name in df.columns if name not in known]
+        if missing:
+            preparer = engine.dialect.identifier_preparer
+            with engine.begin() as conn:
+                for name in missing:
+                    column_type = _column_type(name, df[name].dtype, time_column)
+                    column_type = column_type.compile(dialect=engine.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {preparer.quote_identifier(table)} "
+                        f"ADD COLUMN {preparer.quote_identifier(name)} {column_type}"
+                    ))
+            print(f"➕ 表 {table} 新增列：{', '.join(missing)}")
+
+    if time_column in df.columns:
+        ensure_time_index(engine, table, time_column, unique=unique)
+    return Table(table, MetaData(), autoload_with=engine)
+
+
+def ensure_time_index(engine, table, time_column="Timestamp", unique=False):
+    """在时间列上创建索引（已存在时跳过）；时间列有重复值时无法创建唯一索引"""
+    preparer = engine.dialect.identifier_preparer
+    index_name = f"{'ux' if unique else 'ix'}_{table}_{time_column}"
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+            f"{preparer.quote_identifier(index_name)} ON {preparer.quote_identifier(table)} "
+            f"({preparer.quote_identifier(time_column)})"
+        ))
+
+
+# ====== 写入 ======
+
+def _records(df):
+    """DataFrame 转为 executemany 的参数列表（NaN 转为 NULL，numpy 标量转为 Python 类型）"""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _copy_from_frame(conn, table, df):
+    """Postgres：将一块数据以 CSV 流的形式 COPY 进表"""
+    preparer = conn.dialect.identifier_preparer
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+    columns = ", ".join(preparer.quote_identifier(c) for c in df.columns)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {preparer.quote_identifier(table)} ({columns}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _upsert_statement(conn, target, columns, time_column):
+    """各方言的 INSERT ... ON CONFLICT (时间列) DO UPDATE"""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise ValueError(f"数据库 {conn.dialect.name} 不支持 upsert 模式，请使用 append")
+    stmt = dialect_insert(target)
+    return stmt.on_conflict_do_update(
+        index_elements=[time_column],
+        set_={c: stmt.excluded[c] for c in columns if c != time_column}
+    )
+
+
+def write_chunk(conn, target, df, mode="append", time_column="Timestamp"):
+    """写入一块数据：Postgres append 走 COPY，upsert 先 COPY 到临时表；其他情况用 executemany"""
+    columns = list(df.columns)
+    postgres = conn.dialect.name == "postgresql"
+
+    if mode != "upsert":
+        if postgres:
+            _copy_from_frame(conn, target.name, df)
+        else:
+            conn.execute(insert(target), _records(df))
+        return
+
+    if postgres:
+        preparer = conn.dialect.identifier_preparer
+        staging = f"_ingest_{target.name}"
+        conn.execute(text(
+            f"CREATE TEMP TABLE {preparer.quote_identifier(staging)} "
+            f"(LIKE {preparer.quote_identifier(target.name)}) ON COMMIT DROP"
+        ))
+        _copy_from_frame(conn, staging, df)
+        quoted = ", ".join(preparer.quote_identifier(c) for c in columns)
+        updates = ", ".join(
+            f"{preparer.quote_identifier(c)} = EXCLUDED.{preparer.quote_identifier(c)}"
+            for c in columns if c != time_column
+        )
+        conn.execute(text(
+            f"INSERT INTO {preparer.quote_identifier(target.name)} ({quoted}) "
+            f"SELECT {quoted} FROM {preparer.quote_identifier(staging)} "
+            f"ON CONFLICT ({preparer.quote_identifier(time_column)}) DO UPDATE SET {updates}"
+        ))
+        return
+
+    conn.execute(_upsert_statement(conn, target, columns, time_column), _records(df))
+
+
+def _max_time(engine, table, time_column):
+    """表中时间列的最大值；表或列不存在时返回 None"""
+    preparer = engine.dialect.identifier_preparer
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(
+                f"SELECT MAX({preparer.quote_identifier(time_column)}) "
+                f"FROM {preparer.quote_identifier(table)}"
+            )).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+def ingest(paths, table, mode="append", time_column="Timestamp", chunksize=DEFAULT_CHUNKSIZE,
+           engine=None):
+    """
+    将一个或多个导出文件导入 table，每块数据一个事务。
+    返回 {"rows": 总行数, "seconds": 耗时, "rows_per_sec": 吞吐量}。
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"mode 只能是 {INGEST_MODES} 之一")
+    engine = engine or get_db_engine()
+    started = time.perf_counter()
+    rows = 0
+    target = None
+
+    if mode == "replace":
+        preparer = engine.dialect.identifier_preparer
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {preparer.quote_identifier(table)}"))
+
+    # 追加模式下记录已有的最大时间戳，用于判断本次是否回填了更早的数据
+    latest = _max_time(engine, table, time_column) if mode == "append" else None
+    backfilled = False
+
+    for path in paths:
+        for chunk in read_chunks(path, chunksize):
+            if chunk.empty:
+                continue
+            chunk = normalize_time_column(chunk, time_column)
+            if target is None or any(c not in target.c for c in chunk.columns):
+                target = ensure_table(engine, table, chunk, time_column, unique=mode == "upsert")
+            if latest is not None and time_column in chunk.columns:
+                backfilled = backfilled or bool(chunk[time_column].min() <= latest)
+            with engine.begin() as conn:
+                write_chunk(conn, target, chunk, mode=mode, time_column=time_column)
+            rows += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"  {path}: 已写入 {rows:,} 行（{rows / elapsed:,.0f} 行/秒）")
+
+    record_ingest(engine, table, "backfill" if backfilled else mode, rows)
+    seconds = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds) if seconds else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量导入 RWA 宽表数据（CSV / JSON / JSON Lines）")
+    parser.add_argument("paths", nargs="+", help="导出文件路径")
+    parser.add_argument("--table", help="目标表名（默认取第一个文件名，不含扩展名）")
+    parser.add_argument("--mode", choices=INGEST_MODES, default="append")
+    parser.add_argument("--time-column", default="Timestamp", help="时间列（默认 Timestamp，毫秒）")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="每块行数")
+    parser.add_argument("--db-url", help="数据库地址（默认使用 .env 中的 DATABASE_URL）")
+    args = parser.parse_args(argv)
+
+    if args.db_url:
+        os.environ["DATABASE_URL"] = args.db_url
+    table = args.table or os.path.splitext(os.path.basename(args.paths[0]))[0]
+
+    try:
+        result = ingest(args.paths, table, mode=args.mode, time_column=args.time_column,
+                        chunksize=args.chunksize)
+    except (SQLAlchemyError, ValueError, ConnectionError) as e:
+        print(f"❌ 导入失败：{e}")
+        return 1
+    print(f"✅ 表 {table} 导入完成：{result['rows']:,} 行，用时 {result['seconds']} 秒"
+          f"（{result['rows_per_sec']:,} 行/秒）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
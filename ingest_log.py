@@ -0,0 +1,43 @@
+# ingest_log.py
+# 导入记录表：ingest 命令每次导入写一行，页面的增量同步只读取该表判断历史行是否被修改，
+# 无需扫描数据表本身。
+
+import time
+from sqlalchemy import MetaData, Table, Column, BigInteger, Text, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from db import get_db_engine
+
+INGEST_LOG_TABLE = "ingest_log"
+
+# 会修改已有历史行的导入模式（backfill：追加的数据早于表中已有的最大时间戳）
+HISTORY_CHANGING_MODES = ("upsert", "replace", "backfill")
+
+_ingest_log = Table(
+    INGEST_LOG_TABLE, MetaData(),
+    Column("table_name", Text),
+    Column("mode", Text),
+    Column("rows", BigInteger),
+    Column("ingested_at", BigInteger)
+)
+
+
+def record_ingest(engine, table, mode, rows):
+    """记录一次导入（毫秒时间戳）"""
+    _ingest_log.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(insert(_ingest_log).values(
+            table_name=table, mode=mode, rows=rows, ingested_at=int(time.time() * 1000)
+        ))
+
+
+def get_last_ingest(table, modes=HISTORY_CHANGING_MODES, engine=None):
+    """返回表最近一次指定模式导入的时间（毫秒）；没有记录或记录表不存在时返回 None"""
+    engine = engine or get_db_engine()
+    stmt = select(func.max(_ingest_log.c.ingested_at)).where(
+        _ingest_log.c.table_name == table, _ingest_log.c.mode.in_(modes)
+    )
+    try:
+        with engine.connect() as conn:
+            return conn.execute(stmt).scalar()
+    except SQLAlchemyError:
+        return None
@@ -0,0 +1,230 @@
+# instrumentation.py
+# 热点路径计时：用 span 包住 API 请求、数据库、pandas 变形与绘图调用，
+# 汇总到进程级统计（供管理员面板与指标接口读取），并可按次捕获 cProfile / tracemalloc。
+#
+# 配置：
+# - INSTRUMENT_ENABLED=1：对所有线程（含后台刷新）记录 span 并汇总统计
+# - INSTRUMENT_LOG：JSON Lines 日志文件路径，每次页面运行（trace）写一行
+# 未启用时 span() 直接返回共享的空对象，只有一次布尔判断与一次线程局部变量读取。
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from functools import wraps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+_enabled = os.getenv("INSTRUMENT_ENABLED", "0") == "1"
+_log_path = os.getenv("INSTRUMENT_LOG") or None
+_log_lock = threading.Lock()
+
+# span 名称 -> 最近的耗时（毫秒）与累计次数
+_durations = {}
+_counts = {}
+_stats_lock = threading.Lock()
+
+# 当前线程正在进行的 trace（一次 Streamlit 页面运行）
+_local = threading.local()
+
+
+def instrumentation_enabled():
+    """是否对所有线程记录 span"""
+    return _enabled
+
+
+def set_instrumentation_enabled(enabled):
+    """运行时开启或关闭全局记录（不影响已开始的 trace）"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+class _NullSpan:
+    """未启用时使用的空 span：不计时、不分配对象"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, trace, fields):
+        self.name = name
+        self.trace = trace
+        self.fields = fields
+
+    def __enter__(self):
+        if self.trace is not None:
+            # 进入时占位，保证面板中父 span 排在子 span 之前
+            self.record = {"name": self.name, "ms": None, "depth": self.trace.depth,
+                           "error": None, **self.fields}
+            self.trace.spans.append(self.record)
+            self.trace.depth += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        _record(self.name, elapsed_ms)
+        if self.trace is not None:
+            self.trace.depth -= 1
+            self.record["ms"] = round(elapsed_ms, 2)
+            self.record["error"] = exc_type.__name__ if exc_type else None
+        return False
+
+
+def span(name, **fields):
+    """
+    计时上下文：with span("rwa.melt"): ...
+    全局未启用且当前线程没有 trace 时返回空对象，几乎没有开销。
+    """
+    trace = getattr(_local, "trace", None)
+    if not _enabled and trace is None:
+        return _NULL_SPAN
+    return _Span(name, trace, fields)
+
+
+def timed(name):
+    """装饰器版本的 span，整个函数调用计为一个 span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled and getattr(_local, "trace", None) is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record(name, elapsed_ms):
+    with _stats_lock:
+        durations = _durations.get(name)
+        if durations is None:
+            durations = _durations[name] = deque(maxlen=500)
+            _counts[name] = 0
+        durations.append(elapsed_ms)
+        _counts[name] += 1
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[idx], 2)
+
+
+def get_span_stats():
+    """返回各 span 的调用次数与最近 500 次的 p50/p95/max（毫秒），供面板与指标接口使用"""
+    with _stats_lock:
+        snapshot = {name: (list(d), _counts[name]) for name, d in _durations.items()}
+    stats = {}
+    for name, (durations, count) in sorted(snapshot.items()):
+        durations.sort()
+        stats[name] = {
+            "count": count,
+            "p50_ms": _percentile(durations, 0.5),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": round(durations[-1], 2)
+        }
+    return stats
+
+
+def reset_span_stats():
+    """清空汇总统计"""
+    with _stats_lock:
+        _durations.clear()
+        _counts.clear()
+
+
+class Trace:
+    """一次页面运行中当前线程记录的全部 span，以及可选的 profile 结果"""
+
+    def __init__(self, name, profile=None):
+        self.name = name
+        self.profile_mode = profile if profile in PROFILE_MODES else None
+        self.spans = []
+        self.depth = 0
+        self.total_ms = None
+        self.profile = None
+        self._profiler = None
+        # 只有开启了 tracemalloc 的 trace 才负责关闭它（避免关掉其他会话正在进行的捕获）
+        self._tracing = False
+        self._started = None
+
+    def start(self):
+        # tracemalloc 对整个进程生效，开启期间所有会话的内存分配都会变慢，
+        # 仅供单个管理员排查时短暂使用；app.py 在 finally 中结束 trace，保证中断后也会关闭
+        if self.profile_mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile_mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self, top=25):
+        self.total_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        if self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            self.profile = out.getvalue()
+            self._profiler = None
+        elif self._tracing:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._tracing = False
+            lines = [f"peak: {peak / 1024 / 1024:.2f} MB"]
+            lines += [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+            self.profile = "\n".join(lines)
+        return self
+
+    def to_dict(self):
+        return {
+            "trace": self.name,
+            "ts": time.time(),
+            "total_ms": self.total_ms,
+            "spans": self.spans
+        }
+
+
+def start_trace(name, profile=None):
+    """在当前线程开始一次 trace；profile 为 "cprofile"、"tracemalloc" 或 None"""
+    # 上一次运行被 st.rerun() 等异常中断时，先停止其 profiler
+    previous = getattr(_local, "trace", None)
+    if previous is not None:
+        previous.stop()
+    trace = Trace(name, profile).start()
+    _local.trace = trace
+    return trace
+
+
+def end_trace():
+    """结束当前线程的 trace，写入 JSON Lines 日志（如已配置）并返回该 trace"""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return None
+    _local.trace = None
+    trace.stop()
+    if _log_path:
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with _log_lock:
+            with open(_log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    return trace
@@ -0,0 +1,101 @@
+# normalize.py
+# 将 gamma API 返回的事件/市场 JSON 一次性展开为带类型的 DataFrame
+
+import json
+import pandas as pd
+from translation import get_labels
+
+# 事件列表表格的列：API 字段 -> 翻译键
+EVENT_COLUMNS = {
+    "title": "title",
+    "startDate": "start_date",
+    "endDate": "end_date",
+    "volume": "volume"
+}
+
+# 成交量周期：市场字段 -> 翻译键
+VOLUME_PERIODS = {
+    "volume24hr": "volume_24hr",
+    "volume1wk": "volume_1wk",
+    "volume1mo": "volume_1mo",
+    "volume1yr": "volume_1yr"
+}
+
+
+def parse_json_array(value):
+    """
+    解析 outcomes / outcomePrices 字段（API 以 JSON 字符串返回数组）。
+    使用 JSON 解析器代替 eval；已经是列表时直接返回，格式错误时返回空列表。
+    """
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def _typed(df, date_columns=(), numeric_columns=()):
+    """向量化地转换日期列与数值列"""
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce", utc=True)
+    for col in numeric_columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def events_to_frame(events, columns=None):
+    """将事件列表展开为 DataFrame（日期为 datetime，成交量为数值）"""
+    columns = list(columns or EVENT_COLUMNS.keys())
+    df = pd.DataFrame.from_records(events or [], columns=columns)
+    return _typed(df, date_columns=("startDate", "endDate"), numeric_columns=("volume",))
+
+
+def outcomes_to_frame(markets):
+    """
+    将市场的结果选项与价格展开为长表：market_index, question, outcome, price。
+    字符串数组统一用 JSON 解析，价格一次性转换为数值。
+    """
+    records = []
+    for idx, market in enumerate(markets or []):
+        outcomes = parse_json_array(market.get("outcomes"))
+        prices = parse_json_array(market.get("outcomePrices"))
+        question = market.get("question") or ""
+        for outcome, price in zip(outcomes, prices):
+            records.append((idx, question, outcome, price))
+    df = pd.DataFrame.from_records(records, columns=["market_index", "question", "outcome", "price"])
+    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    return df
+
+
+def market_detail_frame(markets):
+    """
+    将一个事件下全部市场的结果价格与各周期成交量合并为一张长表：
+    market_index, question, metric（"price" / "volume"）, series（结果选项或成交量字段）, value。
+    整个事件只构建一次，合并图表与汇总表都由它派生。
+    """
+    prices = outcomes_to_frame(markets).rename(columns={"outcome": "series", "price": "value"})
+    prices.insert(2, "metric", "price")
+
+    volumes = pd.DataFrame.from_records(markets or [], columns=["question", *VOLUME_PERIODS])
+    volumes.insert(0, "market_index", range(len(volumes)))
+    volumes["question"] = volumes["question"].fillna("")
+    volumes = volumes.melt(id_vars=["market_index", "question"],
+                           var_name="series", value_name="value")
+    volumes.insert(2, "metric", "volume")
+
+    df = pd.concat([prices, volumes[prices.columns]], ignore_index=True)
+    df["series"] = df["series"].astype(str)
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    return df
+
+
+def translate_columns(df, labels, lang):
+    """按翻译键一次性重命名整张表的列（labels：列名 -> 翻译键）"""
+    bundle = get_labels(lang)
+    return df.rename(columns={col: getattr(bundle, key, key) for col, key in labels.items()})
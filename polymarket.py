@@ -0,0 +1,266 @@
+# polymarket.py
+# Polymarket 事件数据的加载：事件详情解析、缓存与后台预取
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import httpx
+from cache import TTLCache, SingleFlight
+from config import get_env_int
+from http_client import gamma_get, gamma_get_async, make_async_client
+from instrumentation import span, timed
+
+# 侧边栏筛选条件的默认值（后台刷新按这些条件预热事件列表）
+DEFAULT_START_DATE = datetime(2024, 9, 1)
+DEFAULT_END_DATE = datetime(2025, 12, 31)
+DEFAULT_VOLUME_MIN = 1000000
+DEFAULT_PAGE_SIZE = 20
+
+# 事件列表缓存（按请求参数），跨会话共享；GAMMA_EVENTS_TTL 为有效期（秒），
+# GAMMA_EVENTS_CACHE_ENTRIES 为条目数上限。过期结果再保留一个 TTL，供请求失败时兜底
+_events_cache = TTLCache(
+    ttl=get_env_int("GAMMA_EVENTS_TTL", 300),
+    max_entries=get_env_int("GAMMA_EVENTS_CACHE_ENTRIES", 500),
+    max_stale=get_env_int("GAMMA_EVENTS_TTL", 300)
+)
+
+# 事件详情缓存（按 slug），跨会话共享；GAMMA_DETAIL_TTL 为有效期（秒），
+# GAMMA_DETAIL_CACHE_ENTRIES 为条目数上限（预取会为每页的全部事件写入详情）
+_detail_cache = TTLCache(
+    ttl=get_env_int("GAMMA_DETAIL_TTL", 120),
+    max_entries=get_env_int("GAMMA_DETAIL_CACHE_ENTRIES", 1000),
+    max_stale=0
+)
+
+# 相同参数 / slug 的并发请求合并为一次 API 调用
+_events_flight = SingleFlight()
+_detail_flight = SingleFlight()
+
+# 后台预取线程池
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=get_env_int("GAMMA_PREFETCH_WORKERS", 4),
+    thread_name_prefix="gamma-prefetch"
+)
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+
+def build_event_params(page_size=DEFAULT_PAGE_SIZE, page=0, active=None,
+                       start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE,
+                       volume_min=DEFAULT_VOLUME_MIN):
+    """构造 /events 列表接口的请求参数；active 为 "true"/"false"，None 表示不限"""
+    params = {
+        "limit": str(page_size),
+        "offset": str(page * page_size),
+        "active": active,
+        "start_date_min": datetime.combine(start_date, datetime.min.time()).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "end_date_max": datetime.combine(end_date, datetime.max.time()).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "volume_min": str(volume_min)
+    }
+    return {k: v for k, v in params.items() if v is not None}
+
+
+def _params_key(params):
+    return tuple(sorted(params.items()))
+
+
+def fetch_events_page(params):
+    """请求一页事件列表（不经过缓存）；重试后仍失败时抛出 ConnectionError，失败结果不会写入缓存"""
+    response = gamma_get("/events", params=params)
+    if response.status_code != 200:
+        raise ConnectionError(f"gamma API 返回 HTTP {response.status_code}")
+    data = response.json()
+    if not isinstance(data, list):
+        raise ConnectionError("gamma API 返回了非列表数据")
+    return data
+
+
+def refresh_events(params):
+    """
+    重新请求事件列表并写入共享缓存（供后台刷新使用）；与同参数的进行中请求合并。
+    请求失败时抛出异常，保留缓存中原有的结果。
+    """
+    key = _params_key(params)
+    return _events_flight.do(key, lambda: _events_cache.set(key, fetch_events_page(params)))
+
+
+def _load_events(key, params):
+    # 等待期间其他请求可能刚写入缓存，再检查一次
+    entry = _events_cache.peek(key)
+    if entry is not None and entry.age() <= _events_cache.ttl:
+        return entry.value
+    return _events_cache.set(key, fetch_events_page(params))
+
+
+@timed("polymarket.fetch_events")
+def fetch_events(params):
+    """
+    获取一页事件列表：优先使用共享缓存（后台刷新会保持其为最新），未命中时再请求 API。
+    多个会话同时未命中时只发出一次请求，其余会话共享结果。
+    请求失败时返回已过期的缓存结果（没有时返回空列表），失败不会写入缓存。
+    """
+    key = _params_key(params)
+    events = _events_cache.get(key)
+    if events is not None:
+        return events
+    try:
+        return _events_flight.do(key, lambda: _load_events(key, params))
+    except (httpx.HTTPError, ConnectionError) as e:
+        print(f"⚠️ 获取事件列表失败：{e}")
+        stale = _events_cache.peek(key)
+        return stale.value if stale is not None else []
+
+
+def get_events_age(params):
+    """返回事件列表缓存距上次刷新的秒数；没有缓存时返回 None"""
+    entry = _events_cache.peek(_params_key(params))
+    return entry.age() if entry is not None else None
+
+
+def fetch_event_detail(slug):
+    """按 slug 获取事件详情（带 TTL 缓存），找不到时返回 None；同一 slug 的并发请求只发出一次"""
+    event = _detail_cache.get(slug)
+    if event is not None:
+        return event
+    return _detail_flight.do(slug, lambda: _load_event_detail(slug))
+
+
+def _load_event_detail(slug):
+    # 等待期间其他请求可能刚写入缓存，再检查一次
+    entry = _detail_cache.peek(slug)
+    if entry is not None and entry.age() <= _detail_cache.ttl:
+        return entry.value
+
+    with span("gamma.event_detail"):
+        response = gamma_get("/events", params={"slug": slug})
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    if isinstance(data, list) and len(data) > 0:
+        return _detail_cache.set(slug, data[0])
+    return None
+
+
+def _event_from_list(slug, events):
+    """列表接口返回的事件已包含 markets 时，直接作为详情使用"""
+    for event in events or []:
+        if event.get("slug") == slug and "markets" in event:
+            return event
+    return None
+
+
+def resolve_event_detail(slug, events=None):
+    """
+    解析事件详情：优先使用已获取的事件列表中的数据，
+    其次读取详情缓存，最后才请求 API。
+    """
+    event = _event_from_list(slug, events)
+    if event is not None:
+        return event
+    return fetch_event_detail(slug)
+
+
+def _prefetch(slug):
+    try:
+        fetch_event_detail(slug)
+    except Exception as e:
+        print(f"⚠️ 预取事件详情失败（{slug}）：{e}")
+    finally:
+        with _prefetch_lock:
+            _prefetching.discard(slug)
+
+
+def prefetch_event_details(events):
+    """
+    在后台并发预取本页其他事件的详情，切换下拉框时即可直接命中缓存。
+    已能从列表解析、已缓存或正在预取的 slug 会被跳过。
+    """
+    for event in events or []:
+        slug = event.get("slug")
+        if not slug or "markets" in event or _detail_cache.is_fresh(slug):
+            continue
+        with _prefetch_lock:
+            if slug in _prefetching:
+                continue
+            _prefetching.add(slug)
+        _prefetch_executor.submit(_prefetch, slug)
+
+
+def get_detail_cache_stats():
+    """返回事件详情缓存的统计信息（含请求合并次数）"""
+    return dict(_detail_cache.stats(), coalescing=_detail_flight.stats())
+
+
+def get_events_cache_stats():
+    """返回事件列表缓存的统计信息（含请求合并次数）"""
+    return dict(_events_cache.stats(), coalescing=_events_flight.stats())
+
+
+def merge_events(*pages):
+    """合并多页事件并按 id 去重（保留首次出现的顺序）"""
+    seen = set()
+    merged = []
+    for page in pages:
+        for event in page:
+            event_id = event.get("id") or event.get("slug")
+            if event_id in seen:
+                continue
+            seen.add(event_id)
+            merged.append(event)
+    return merged
+
+
+async def _fetch_page_async(client, semaphore, params, offset, page_size):
+    page_params = dict(params, limit=str(page_size), offset=str(offset))
+    async with semaphore:
+        response = await gamma_get_async(client, "/events", params=page_params)
+    # 失败的页不能当作最后一页，否则会返回被截断的"全部事件"
+    if response.status_code != 200:
+        raise ConnectionError(f"获取事件列表失败（offset={offset}）：HTTP {response.status_code}")
+    data = response.json()
+    if not isinstance(data, list):
+        raise ConnectionError(f"事件列表返回了非列表数据（offset={offset}）")
+    return data
+
+
+async def fetch_all_events_async(params, page_size=100, max_concurrency=5, max_pages=200):
+    """
+    并发拉取符合筛选条件的全部事件。
+    每轮并发请求 max_concurrency 页，遇到不足一页的结果即停止；
+    max_pages 为安全上限，防止无限翻页；达到上限仍未遇到不足一页的结果时，
+    结果不完整，抛出 ConnectionError（不返回截断的列表）。任何一页重试后仍失败时同样抛出 ConnectionError。
+    """
+    params = {k: v for k, v in params.items() if k not in ("limit", "offset")}
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pages = []
+    async with make_async_client() as client:
+        next_page = 0
+        while next_page < max_pages:
+            batch = range(next_page, min(next_page + max_concurrency, max_pages))
+            results = await asyncio.gather(*[
+                _fetch_page_async(client, semaphore, params, page * page_size, page_size)
+                for page in batch
+            ])
+            for result in results:
+                pages.append(result)
+                if len(result) < page_size:
+                    return merge_events(*pages)
+            next_page = batch.stop
+    raise ConnectionError(f"事件超过 {max_pages} 页（每页 {page_size} 条），结果不完整")
+
+
+def fetch_all_events(params, page_size=None, max_concurrency=None, max_pages=None):
+    """
+    fetch_all_events_async 的同步封装（页大小、并发数与页数上限可通过环境变量配置）。
+    结果不完整时抛出 ConnectionError（网络错误也统一转换为 ConnectionError）。
+    """
+    try:
+        return asyncio.run(fetch_all_events_async(
+            params,
+            page_size=page_size or get_env_int("GAMMA_BULK_PAGE_SIZE", 100),
+            max_concurrency=max_concurrency or get_env_int("GAMMA_BULK_CONCURRENCY", 5),
+            max_pages=max_pages or get_env_int("GAMMA_BULK_MAX_PAGES", 200)
+        ))
+    except httpx.HTTPError as e:
+        raise ConnectionError(f"获取事件列表失败：{e}") from e
@@ -0,0 +1,182 @@
+# price_history.py
+# Polymarket 市场价格与成交量的历史快照：定期采集、批量写入时序表、按区间查询。
+# 与上次采集相同的行不重复写入，超过 PRICE_HISTORY_RETENTION_DAYS 天的行定期删除。
+
+import os
+import threading
+import time
+import pandas as pd
+from sqlalchemy import (
+    MetaData, Table, Column, String, Integer, BigInteger, Float, Index,
+    create_engine, delete, insert, select
+)
+from config import get_env_int
+from db import get_db_engine
+from normalize import parse_json_array
+
+HISTORY_TABLE = "polymarket_market_history"
+
+metadata = MetaData()
+
+# 每行一个 (市场, 时间点, 结果选项) 的快照；ts 为 UTC 毫秒
+market_history = Table(
+    HISTORY_TABLE, metadata,
+    Column("market_id", String(64), nullable=False),
+    Column("ts", BigInteger, nullable=False),
+    Column("outcome_index", Integer, nullable=False),
+    Column("outcome", String(128)),
+    Column("price", Float),
+    Column("volume", Float),
+    Column("volume24hr", Float),
+    Column("liquidity", Float),
+    Index(f"ix_{HISTORY_TABLE}_market_ts", "market_id", "ts"),
+    # 按时间删除过期行时使用
+    Index(f"ix_{HISTORY_TABLE}_ts", "ts")
+)
+
+# 快照中参与去重比较的值列
+VALUE_COLUMNS = ("price", "volume", "volume24hr", "liquidity")
+
+# (market_id, outcome_index) -> 最近一次写入的值，用于跳过未变化的行（进程重启后重新开始）
+_last_values = {}
+_last_values_lock = threading.Lock()
+_last_purge = None
+
+_history_engine = None
+_history_lock = threading.Lock()
+
+
+def history_enabled():
+    """PRICE_HISTORY_ENABLED=1 时启用价格历史的采集与展示"""
+    return get_env_int("PRICE_HISTORY_ENABLED", 0) == 1
+
+
+def get_history_engine():
+    """
+    返回历史表所用的引擎（首次调用时建表与索引）：
+    设置了 PRICE_HISTORY_URL（如 sqlite:///price_history.db）时使用该本地数据库，
+    否则复用 db.py 的共享引擎。
+    """
+    global _history_engine
+    if _history_engine is not None:
+        return _history_engine
+
+    with _history_lock:
+        if _history_engine is None:
+            url = os.getenv("PRICE_HISTORY_URL")
+            engine = create_engine(url) if url else get_db_engine()
+            metadata.create_all(engine, checkfirst=True)
+            # 表已存在时 create_all 不会补建后来新增的索引
+            for index in market_history.indexes:
+                index.create(engine, checkfirst=True)
+            _history_engine = engine
+    return _history_engine
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def market_snapshot_rows(markets, ts=None):
+    """将市场列表展开为历史表的行（每个结果选项一行）"""
+    ts = ts if ts is not None else int(time.time() * 1000)
+    rows = []
+    for market in markets or []:
+        market_id = market.get("id")
+        if market_id is None:
+            continue
+        outcomes = parse_json_array(market.get("outcomes"))
+        prices = parse_json_array(market.get("outcomePrices"))
+        for idx, (outcome, price) in enumerate(zip(outcomes, prices)):
+            rows.append({
+                "market_id": str(market_id),
+                "ts": ts,
+                "outcome_index": idx,
+                "outcome": str(outcome)[:128],
+                "price": _to_float(price),
+                "volume": _to_float(market.get("volume")),
+                "volume24hr": _to_float(market.get("volume24hr")),
+                "liquidity": _to_float(market.get("liquidity"))
+            })
+    return rows
+
+
+def write_snapshots(rows, engine=None, batch_size=1000):
+    """按批写入快照行（executemany），返回写入的行数"""
+    engine = engine or get_history_engine()
+    with engine.begin() as conn:
+        for start in range(0, len(rows), batch_size):
+            conn.execute(insert(market_history), rows[start:start + batch_size])
+    return len(rows)
+
+
+def _changed_rows(rows):
+    """只保留价格、成交量等与上次写入相比有变化的行，并记下本次的值"""
+    changed = []
+    with _last_values_lock:
+        for row in rows:
+            key = (row["market_id"], row["outcome_index"])
+            values = tuple(row[c] for c in VALUE_COLUMNS)
+            if _last_values.get(key) != values:
+                _last_values[key] = values
+                changed.append(row)
+    return changed
+
+
+def purge_old_snapshots(engine=None, retention_days=None):
+    """删除超过保留天数（PRICE_HISTORY_RETENTION_DAYS，默认 30，0 表示不删除）的快照，返回删除的行数"""
+    if retention_days is None:
+        retention_days = get_env_int("PRICE_HISTORY_RETENTION_DAYS", 30)
+    if retention_days <= 0:
+        return 0
+    engine = engine or get_history_engine()
+    cutoff = int((time.time() - retention_days * 86400) * 1000)
+    with engine.begin() as conn:
+        return conn.execute(delete(market_history).where(market_history.c.ts < cutoff)).rowcount
+
+
+def collect_market_snapshots(events, engine=None):
+    """
+    对一组事件下的全部市场做一次快照并写入历史表（跳过与上次相同的行），
+    每小时最多清理一次过期快照；返回写入的行数
+    """
+    global _last_purge
+    markets = [m for e in events or [] for m in e.get("markets") or []]
+    written = write_snapshots(_changed_rows(market_snapshot_rows(markets)), engine=engine)
+    if _last_purge is None or time.monotonic() - _last_purge >= 3600:
+        _last_purge = time.monotonic()
+        purge_old_snapshots(engine=engine)
+    return written
+
+
+def history_window_start(days=None):
+    """页面展示的时间窗口起点（UTC 毫秒）：最近 PRICE_HISTORY_WINDOW_DAYS 天，默认 7"""
+    if days is None:
+        days = get_env_int("PRICE_HISTORY_WINDOW_DAYS", 7)
+    return int((time.time() - days * 86400) * 1000)
+
+
+def query_price_history(market_id, start_ts=None, end_ts=None, engine=None):
+    """
+    按市场与时间区间查询价格历史（命中 (market_id, ts) 索引），
+    返回 DataFrame：ts（datetime）、outcome、price、volume。
+    未变化的值不会重复采集，图表中两个点之间的价格即为前一个点的值。
+    """
+    engine = engine or get_history_engine()
+    stmt = select(
+        market_history.c.ts, market_history.c.outcome,
+        market_history.c.price, market_history.c.volume
+    ).where(market_history.c.market_id == str(market_id))
+    if start_ts is not None:
+        stmt = stmt.where(market_history.c.ts >= start_ts)
+    if end_ts is not None:
+        stmt = stmt.where(market_history.c.ts <= end_ts)
+    stmt = stmt.order_by(market_history.c.ts, market_history.c.outcome_index)
+
+    with engine.connect() as conn:
+        df = pd.read_sql(stmt, conn)
+    df["ts"] = pd.to_datetime(df["ts"], unit="ms")
+    return df
@@ -0,0 +1,110 @@
+# refresher.py
+# 后台刷新线程：定期刷新热点数据（默认筛选条件下的事件列表、各 RWA 表），
+# 让页面请求总能命中已预热的共享缓存，而不是由触发缓存未命中的用户承担延迟。
+
+import threading
+import time
+from config import get_env_int
+from polymarket import build_event_params, refresh_events, fetch_events
+
+_thread = None
+_thread_lock = threading.Lock()
+_stop_event = threading.Event()
+
+# 每个任务最近一次的执行结果
+_status = {}
+_status_lock = threading.Lock()
+
+
+def _refresh_default_events():
+    """刷新默认筛选条件下的前 REFRESH_EVENT_PAGES 页事件（全部 / 活跃 / 非活跃）"""
+    pages = get_env_int("REFRESH_EVENT_PAGES", 1)
+    for active in (None, "true", "false"):
+        for page in range(pages):
+            refresh_events(build_event_params(page=page, active=active))
+
+
+def _refresh_rwa_tables():
+    """增量同步每张 RWA 表（启用快照时同时重写快照）"""
+    # 延迟导入，避免 rwa 的依赖（SQLAlchemy、Plotly）拖慢启动
+    from rwa import list_rwa_tables, refresh_rwa_table
+    for table in list_rwa_tables():
+        refresh_rwa_table(table)
+
+
+def _collect_price_history():
+    """为默认筛选条件下的事件市场采集一次价格/成交量快照"""
+    from price_history import history_enabled, collect_market_snapshots
+    if not history_enabled():
+        return
+    pages = get_env_int("REFRESH_EVENT_PAGES", 1)
+    events = []
+    for page in range(pages):
+        events.extend(fetch_events(build_event_params(page=page)))
+    collect_market_snapshots(events)
+
+
+# 刷新任务：名称 -> 函数（价格快照在事件列表刷新之后执行，直接使用最新数据）
+REFRESH_JOBS = {
+    "polymarket_events": _refresh_default_events,
+    "price_history": _collect_price_history,
+    "rwa_tables": _refresh_rwa_tables
+}
+
+
+def run_refresh_jobs():
+    """依次执行所有刷新任务，单个任务失败不影响其他任务"""
+    for name, job in REFRESH_JOBS.items():
+        started = time.perf_counter()
+        try:
+            job()
+            error = None
+        except Exception as e:
+            error = str(e)
+            print(f"⚠️ 后台刷新任务 {name} 失败：{e}")
+        with _status_lock:
+            _status[name] = {
+                "finished_at": time.time(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": error
+            }
+
+
+def _run(interval):
+    while not _stop_event.is_set():
+        run_refresh_jobs()
+        _stop_event.wait(interval)
+
+
+def start_background_refresher():
+    """
+    启动后台刷新线程（每个进程只启动一次，重复调用无副作用）。
+    刷新间隔由 REFRESH_INTERVAL（秒，默认 60）配置，设为 0 可关闭后台刷新。
+    """
+    global _thread
+    interval = get_env_int("REFRESH_INTERVAL", 60)
+    if interval <= 0:
+        return None
+
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _stop_event.clear()
+            _thread = threading.Thread(target=_run, args=(interval,),
+                                       name="data-refresher", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def stop_background_refresher():
+    """停止后台刷新线程"""
+    _stop_event.set()
+
+
+def get_refresher_status():
+    """返回各刷新任务最近一次的耗时、距今秒数与错误信息"""
+    now = time.time()
+    with _status_lock:
+        return {
+            name: dict(status, age_s=round(now - status["finished_at"], 1))
+            for name, status in _status.items()
+        }
@@ -1,234 +1,736 @@
 # rwa.py
 
+import os
+import re
+import threading
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from cache import TTLCache, SingleFlight
+from config import get_env_int
 from db import get_db_engine
+from rwa_snapshot import (
+    snapshots_enabled,
+    snapshot_age,
+    snapshot_path,
+    write_snapshot_chunks,
+    append_snapshot,
+    read_snapshot,
+    read_snapshot_schema,
+    read_snapshot_metadata,
+    snapshot_column_max,
+    iter_snapshot_chunks,
+    numeric_columns_from_schema
+)
+from rwa_query import build_series_query, get_numeric_columns, get_time_column, list_tables
+from downsample import GRANULARITIES, resample_frame, downsample_long
+from rwa_aggregates import (
+    materialize_aggregates,
+    materialize_chunk_aggregates,
+    get_cached_aggregates
+)
+from instrumentation import span, timed
+from ingest_log import get_last_ingest
+from rwa_catalog import (
+    RWA_CATALOG,
+    get_asset_type,
+    declared_tables,
+    discovered_section
+)
+
+# 折线图每个序列的最大点数（RWA_MAX_POINTS）
+MAX_POINTS_PER_SERIES = get_env_int("RWA_MAX_POINTS", 1000)
+
+
+def select_granularity(key, index=0):
+    """时间粒度选择控件"""
+    return st.radio("时间粒度", options=list(GRANULARITIES.keys()),
+                    index=index, horizontal=True, key=key)
+
+# 资产目录中声明的 RWA 数据表（按约定命名、自动发现的表见 list_rwa_tables）
+RWA_TABLES = declared_tables()
+
+# 跨会话共享的查询结果缓存（按 SQL 文本做键）
+# RWA_CACHE_TTL：缓存有效期（秒）；RWA_CACHE_MAX_MB：缓存内存上限（MB）
+_rwa_cache = TTLCache(
+    ttl=get_env_int("RWA_CACHE_TTL", 300),
+    max_bytes=get_env_int("RWA_CACHE_MAX_MB", 256) * 1024 * 1024
+)
+
+# 相同查询 / 序列的并发加载合并为一次（缓存过期瞬间避免重复读取整张表）
+_rwa_flight = SingleFlight()
+
+_TABLE_PATTERN = re.compile(r'\bFROM\s+("[^"]+"|[^\s;]+)', re.IGNORECASE)
+
+
+def _table_from_query(query):
+    """从简单的 SELECT 语句中提取表名，无法识别时返回 None"""
+    match = _TABLE_PATTERN.search(query)
+    return match.group(1) if match else None
+
+
+def _table_fingerprint(engine, table):
+    """
+    计算表的轻量指纹：(行数, 最大时间戳)。
+    表没有 Timestamp 列时退化为只比较行数；查询失败时返回 None。
+    """
+    for sql in (f'SELECT COUNT(*), MAX("Timestamp") FROM {table}',
+                f'SELECT COUNT(*), NULL FROM {table}'):
+        try:
+            with engine.connect() as conn:
+                row = conn.execute(text(sql)).one()
+            return (row[0], row[1])
+        except SQLAlchemyError:
+            continue
+    return None
+
+
+# 流式读取的分块行数（RWA_STREAM_CHUNKSIZE），设为 0 时一次性读取
+STREAM_CHUNKSIZE = get_env_int("RWA_STREAM_CHUNKSIZE", 50000)
+
+
+# 时间列不参与压缩：毫秒时间戳超出 float32 的精度，压缩后会落到错误的日期
+TIME_COLUMNS = ('Timestamp', 'Date')
+
+
+def downcast_frame(df):
+    """将数值列中的浮点列压缩为 float32，减少一半内存（市值等数据用于绘图，精度足够）"""
+    float_columns = [c for c in df.select_dtypes(include=['float64']).columns
+                     if c not in TIME_COLUMNS]
+    if len(float_columns):
+        df[float_columns] = df[float_columns].astype('float32')
+    return df
+
 
-def load_rwa_data(query):
-    """通用函数：从数据库执行 SQL 查询并返回 DataFrame"""
+def stream_rwa_data(query, params=None, chunksize=None, downcast=True):
+    """
+    使用服务端游标（stream_results）按块读取查询结果，逐块产出 DataFrame。
+    每块到达时立即压缩数值类型，内存峰值取决于块大小而非表大小。
+    """
+    chunksize = chunksize or STREAM_CHUNKSIZE or 50000
     engine = get_db_engine()
-    with engine.connect() as conn:
-        df = pd.read_sql(query, conn)
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in pd.read_sql(text(query), conn, params=params, chunksize=chunksize):
+            yield downcast_frame(chunk) if downcast else chunk
+
+
+def reduce_rwa_chunks(query, reducer, params=None, chunksize=None, finalize=None):
+    """
+    流式读取并对每个分块应用 reducer（如按周聚合、降采样），
+    只保留归约后的结果，最后合并返回。
+    同一时间段可能跨越两个分块，可通过 finalize 对合并结果再归约一次。
+    """
+    parts = [reducer(chunk) for chunk in stream_rwa_data(query, params=params, chunksize=chunksize)]
+    if not parts:
+        return pd.DataFrame()
+    result = pd.concat(parts, ignore_index=True)
+    return finalize(result) if finalize else result
+
+
+def read_rwa_frame(query, params=None):
+    """
+    读取完整查询结果：启用流式读取时逐块压缩后再合并，文本列转换为 category。
+    合并时分块与结果同时存在，内存峰值约为结果的两倍；只需要聚合结果时应使用 reduce_rwa_chunks。
+    """
+    if STREAM_CHUNKSIZE <= 0:
+        with get_db_engine().connect() as conn:
+            return pd.read_sql(text(query), conn, params=params)
+
+    chunks = list(stream_rwa_data(query, params=params))
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    for col in df.select_dtypes(include=['object']).columns:
+        if df[col].nunique() < len(df) / 2:
+            df[col] = df[col].astype('category')
     return df
 
-def show_stablecoin():
-    st.header("稳定币 🪙")
-    st.subheader("各链上稳定币市场价值（Bridged Token Market Cap）")
 
-    query = "SELECT * FROM rwa_稳定币_代币;"
-    
-    try:
-        df = load_rwa_data(query)
-
-        if not df.empty:
-            # 转换时间戳列
-            if 'Timestamp' in df.columns:
-                df['Date'] = pd.to_datetime(df['Timestamp'], unit='ms')
-            elif 'Date' in df.columns:
-                df['Date'] = pd.to_datetime(df['Date'], format='%Y/%m/%d')
-
-            # 筛选所有资产列（排除非数值列）
-            asset_columns = df.select_dtypes(include=['number']).columns.tolist()
-
-            if len(asset_columns) == 0:
-                st.warning("没有可绘制的数值列，请检查数据结构。")
-                return
-
-            # 长格式转换，便于 Plotly 展示
-            df_long = df.melt(id_vars=['Date'], value_vars=asset_columns,
-                              var_name='Chain_Asset', value_name='Value')
-
-            # 去除 NaN 或 0 值以避免干扰图表
-            df_long = df_long.dropna()
-            df_long = df_long[df_long['Value'] > 0]
-
-            # 初始化 session_state 中的资产选择状态
-            if "selected_assets" not in st.session_state:
-                st.session_state.selected_assets = []
-
-            # 添加多选控件
-            selected_assets = st.multiselect(
-                "请选择要显示的稳定币资产",
-                options=sorted(asset_columns),
-                default=st.session_state.selected_assets,
-                key="stablecoin_asset_multiselect"
-            )
+@timed("rwa.load_rwa_data")
+def load_rwa_data(query, params=None, use_cache=True):
+    """
+    通用函数：从数据库执行 SQL 查询并返回 DataFrame。
+    结果在所有会话间共享缓存（键为 SQL 文本与绑定参数）；缓存过期后先比较表指纹，
+    表未变化时直接续期，不再重新读取整张表。
+    多个会话同时未命中同一查询时只执行一次，其余会话等待并共享结果。
+    """
+    key = (query, tuple(sorted(params.items()))) if params else query
+    if use_cache:
+        df = _rwa_cache.get(key)
+        if df is not None:
+            # 浅拷贝：调用方新增列（如 Date）不会影响共享缓存
+            return df.copy(deep=False)
+
+    df = _rwa_flight.do((key, use_cache), lambda: _load_rwa_frame(query, params, key, use_cache))
+    return df.copy(deep=False)
+
+
+def _load_rwa_frame(query, params, key, use_cache):
+    """load_rwa_data 的实际加载（每个 key 同时只有一个线程执行）"""
+    if use_cache:
+        # 等待期间其他请求可能刚写入缓存，再检查一次
+        entry = _rwa_cache.peek(key)
+        if entry is not None and entry.age() <= _rwa_cache.ttl:
+            return entry.value
+
+    engine = get_db_engine()
+    table = _table_from_query(query)
+    fingerprint = _table_fingerprint(engine, table) if table else None
+
+    if use_cache and fingerprint is not None:
+        entry = _rwa_cache.peek(key)
+        if entry is not None and entry.fingerprint == fingerprint:
+            # 直接使用 peek 拿到的数据：即使条目此时已被淘汰，数据本身仍然有效
+            _rwa_cache.touch(key)
+            return entry.value
+
+    df = read_rwa_frame(query, params=params)
 
-            # 判断是否发生变化，仅当变化时才更新 session_state 并刷新页面
-            if selected_assets != st.session_state.selected_assets:
-                st.session_state.selected_assets = selected_assets
-                st.rerun()
-
-            # 过滤数据
-            if st.session_state.selected_assets:
-                filtered_df = df_long[df_long['Chain_Asset'].isin(st.session_state.selected_assets)]
-            else:
-                filtered_df = pd.DataFrame()  # 空数据
-
-            # 绘制图表
-            if not filtered_df.empty:
-                fig = px.line(
-                    filtered_df,
-                    x='Date',
-                    y='Value',
-                    color='Chain_Asset',
-                    title="所选稳定币资产的时间序列趋势",
-                    labels={'Value': '市场价值 (美元)', 'Date': '时间'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("请从上方选择至少一个资产进行展示。")
+    if use_cache:
+        _rwa_cache.set(key, df, fingerprint)
+    return df
+
+
+def parse_rwa_dates(df):
+    """根据 Timestamp（毫秒）或 Date（YYYY/MM/DD）列生成统一的 Date 列"""
+    if 'Timestamp' in df.columns:
+        df['Date'] = pd.to_datetime(df['Timestamp'], unit='ms')
+    elif 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y/%m/%d')
+    return df
 
+
+def _to_sql_param(value):
+    """将 numpy 标量转换为数据库驱动可识别的 Python 原生类型"""
+    return value.item() if hasattr(value, "item") else value
+
+
+class IncrementalTable:
+    """
+    RWA 时间序列表的增量同步器。
+    首次加载读取整张表，之后只查询 Timestamp 大于已知最大值的新行，
+    仅对新行做日期解析后追加到已有 DataFrame；发现历史行被修改时重新全量读取。
+    """
+
+    def __init__(self, table, time_column="Timestamp", min_interval=60):
+        self.table = table
+        self.time_column = time_column
+        # 两次增量查询之间的最短间隔（秒），避免每次页面刷新都访问数据库
+        self.min_interval = min_interval
+        self.df = None
+        self.last_value = None
+        self.synced_at = None
+        # 数据版本号：每次有新数据时递增，用作派生结果缓存键的一部分
+        self.version = 0
+        # 全量读取时该表最近一次修改历史行的导入时间（见 ingest_log.py）
+        self.ingest_marker = None
+        self._lock = threading.Lock()
+
+    def _read(self, sql, params=None):
+        return read_rwa_frame(sql, params=params)
+
+    def _history_changed(self):
+        """
+        已加载的历史行是否失效：只比较 ingest_log 中该表最近一次 upsert / replace / backfill
+        导入的时间（一次很小的查询），不扫描数据表本身
+        """
+        return get_last_ingest(self.table) != self.ingest_marker
+
+    def sync(self):
+        """从数据库拉取新行并追加，返回本次新增的行数（历史行变化后重新全量读取，返回全部行数）"""
+        col = self.time_column
+        reloaded = False
+        if self.df is not None and self._history_changed():
+            print(f"⚠️ 表 {self.table} 的历史数据已变化，重新全量读取")
+            self.df = None
+            self.last_value = None
+            reloaded = True
+        if self.df is None:
+            self.ingest_marker = get_last_ingest(self.table)
+            new_rows = self._read(f"SELECT * FROM {self.table}")
+            if col in new_rows.columns:
+                new_rows = new_rows.sort_values(col, ignore_index=True)
+            self.df = parse_rwa_dates(new_rows)
+        elif col not in self.df.columns:
+            # 没有时间戳列的表无法增量同步，退化为带缓存的全量读取（表指纹未变时直接命中缓存）；
+            # 内容与已加载的数据相同时不算新数据，版本号保持不变
+            df = parse_rwa_dates(load_rwa_data(f"SELECT * FROM {self.table};"))
+            new_rows = df.iloc[:0] if df.equals(self.df) else df
+            self.df = df
         else:
-            st.warning("数据库中没有找到相关数据。")
-
-    except Exception as e:
-        st.error(f"加载或解析数据失败: {e}")
-
-def show_treasury_bonds():
-    st.header("美国国债 🏦")
-    st.subheader("各链上代币化资产价值（Bridged Token Value）")
-
-    # 查询主表（链资产）
-    query_assets = "SELECT * FROM rwa_美国国债_代币;"
-    df_assets = load_rwa_data(query_assets)
-
-    # 查询管辖权表（国家分布）
-    query_jurisdictions = "SELECT * FROM rwa_美国国债_管辖权;"
-    df_jurisdictions = load_rwa_data(query_jurisdictions)
-
-    if not df_assets.empty:
-        # 处理时间列
-        if 'Timestamp' in df_assets.columns:
-            df_assets['Date'] = pd.to_datetime(df_assets['Timestamp'], unit='ms')
-        elif 'Date' in df_assets.columns:
-            df_assets['Date'] = pd.to_datetime(df_assets['Date'], format='%Y/%m/%d')
-
-        # 获取资产列
-        asset_columns = df_assets.select_dtypes(include=['number']).columns.tolist()
-        if 'Date' in asset_columns:
-            asset_columns.remove('Date')
-        if 'Timestamp' in asset_columns:
-            asset_columns.remove('Timestamp')
-
-        # 初始化 session_state
-        if "selected_assets" not in st.session_state:
-            st.session_state.selected_assets = []
-
-        # 资产多选控件
-        selected_assets = st.multiselect(
-            "请选择要显示的链上资产",
-            options=sorted(asset_columns),
-            default=st.session_state.selected_assets,
-            key="asset_multiselect"
+            new_rows = self._read(
+                f'SELECT * FROM {self.table} WHERE "{col}" > :last ORDER BY "{col}"',
+                params={"last": _to_sql_param(self.last_value)}
+            )
+            if not new_rows.empty:
+                new_rows = parse_rwa_dates(new_rows)
+                self.df = pd.concat([self.df, new_rows], ignore_index=True)
+
+        if col in self.df.columns and not self.df.empty:
+            self.last_value = self.df[col].max()
+        if len(new_rows) or reloaded:
+            self.version += 1
+        self.synced_at = time.monotonic()
+        return len(new_rows)
+
+    def load(self, force=False):
+        """返回最新数据；距上次同步超过 min_interval 或 force=True 时先增量同步"""
+        with self._lock:
+            if (force or self.df is None or self.synced_at is None
+                    or time.monotonic() - self.synced_at >= self.min_interval):
+                self.sync()
+            # 浅拷贝：调用方新增列不会影响共享数据
+            return self.df.copy(deep=False)
+
+    def refresh(self):
+        """立即同步，返回 (数据是否变化, 最新数据)；供后台刷新判断是否需要重写快照与汇总"""
+        with self._lock:
+            version = self.version
+            self.sync()
+            return self.version != version, self.df.copy(deep=False)
+
+    def reset(self):
+        """丢弃已加载的数据，下次加载时重新全量读取（历史数据被修改时使用）"""
+        with self._lock:
+            self.df = None
+            self.last_value = None
+            self.synced_at = None
+
+
+# 每张表一个增量同步器，所有会话共享
+_incremental_tables = {}
+_incremental_lock = threading.Lock()
+
+
+def _get_loader(table):
+    """返回表的共享增量同步器（不存在时创建）"""
+    with _incremental_lock:
+        loader = _incremental_tables.get(table)
+        if loader is None:
+            loader = IncrementalTable(table, min_interval=get_env_int("RWA_SYNC_INTERVAL", 60))
+            _incremental_tables[table] = loader
+    return loader
+
+
+def load_rwa_table(table, force=False):
+    """增量加载整张 RWA 时间序列表，返回带 Date 列的 DataFrame"""
+    return _get_loader(table).load(force=force)
+
+
+def get_rwa_table_age(table):
+    """返回表距上次同步的秒数；尚未加载时返回 None"""
+    if snapshots_enabled():
+        return _snapshot_checked_age(table)
+    loader = _incremental_tables.get(table)
+    if loader is None or loader.synced_at is None:
+        return None
+    return time.monotonic() - loader.synced_at
+
+
+def refresh_rwa_table(table):
+    """
+    同步表的最新数据并预计算汇总指标，供后台刷新使用。
+    没有新数据时不重写快照、不重新计算汇总，数据版本保持不变，已缓存的序列继续有效。
+    """
+    if snapshots_enabled():
+        # 快照由数据库流式写入，汇总指标也按记录批次逐块计算，整表不会常驻内存
+        changed = refresh_rwa_snapshot(table)
+        if changed or get_cached_aggregates(table, version=_data_version(table)) is None:
+            _materialize_snapshot(table, _data_version(table))
+        return
+    changed, df = _get_loader(table).refresh()
+    if changed or get_cached_aggregates(table, version=_data_version(table)) is None:
+        _materialize(table, df)
+
+
+def _materialize(table, df):
+    value_columns = [c for c in df.select_dtypes(include=['number']).columns
+                     if c not in ('Timestamp', 'Date')]
+    return materialize_aggregates(table, df, value_columns, version=_data_version(table))
+
+
+def _materialize_snapshot(table, version):
+    """从快照逐个记录批次计算汇总指标，只读取 Date 与数值列"""
+    columns = list_rwa_numeric_columns(table)
+    chunks = iter_snapshot_chunks(table, ['Date'] + columns)
+    return materialize_chunk_aggregates(table, chunks, columns, version=version)
+
+
+def get_rwa_aggregates(table):
+    """
+    返回表的汇总指标（totals：每日合计；summary：最新值、占比、7/30 日增长率）。
+    通常已由后台刷新预先计算；尚未计算时，整表不在内存中则只查询数值列并逐块计算，
+    不会把整张表读入内存。没有数据版本时结果按 RWA_CACHE_TTL 过期。
+    """
+    version = _data_version(table)
+    result = get_cached_aggregates(table, version=version,
+                                   max_age=_rwa_cache.ttl if version is None else None)
+    if result is None:
+        result = _rwa_flight.do(("aggregates", table, version),
+                                lambda: _build_aggregates(table, version))
+    return result
+
+
+def _build_aggregates(table, version):
+    """get_rwa_aggregates 的实际计算（每张表同时只有一个线程执行）"""
+    if snapshots_enabled():
+        _ensure_snapshot(table)
+        return _materialize_snapshot(table, version)
+    if _table_in_memory(table):
+        return _materialize(table, load_rwa_columns(table))
+
+    columns = get_numeric_columns(table)
+    query, params = build_series_query(table, columns)
+    chunks = (parse_rwa_dates(chunk) for chunk in stream_rwa_data(query, params=params))
+    return materialize_chunk_aggregates(table, chunks, columns, version=version)
+
+
+def show_aggregates(table, label):
+    """展示预计算的合计、增长率与占比（只读取很小的结果表）"""
+    aggregates = get_rwa_aggregates(table)
+    summary = aggregates["summary"]
+    if summary.empty or '合计' not in summary.index:
+        return
+
+    total = summary.loc['合计']
+    col_total, col_7d, col_30d = st.columns(3)
+    col_total.metric(f"{label}合计 (美元)", f"{total['latest']:,.0f}")
+    col_7d.metric("7 日增长", "-" if pd.isna(total['growth_7d']) else f"{total['growth_7d']:.2%}")
+    col_30d.metric("30 日增长", "-" if pd.isna(total['growth_30d']) else f"{total['growth_30d']:.2%}")
+
+    with st.expander(f"各{label}占比与增长率", expanded=False):
+        st.dataframe(
+            summary.drop(index='合计').rename(columns={
+                'latest': '最新值 (美元)', 'share': '占比',
+                'growth_7d': '7 日增长', 'growth_30d': '30 日增长'
+            }).style.format({
+                '最新值 (美元)': '{:,.0f}', '占比': '{:.2%}',
+                '7 日增长': '{:.2%}', '30 日增长': '{:.2%}'
+            }, na_rep='-')
         )
 
-        # 判断是否发生变化，仅当变化时才更新 session_state 并刷新
-        if selected_assets != st.session_state.selected_assets:
-            st.session_state.selected_assets = selected_assets
-            st.rerun()
-
-        # 过滤数据
-        if st.session_state.selected_assets:
-            filtered_df = df_assets.melt(id_vars=['Date'],
-                                          value_vars=st.session_state.selected_assets,
-                                          var_name='Chain_Asset',
-                                          value_name='Value')
-            filtered_df = filtered_df[filtered_df['Value'] > 0]
-
-            fig_assets = px.line(
-                filtered_df,
-                x='Date',
-                y='Value',
-                color='Chain_Asset',
-                title="所选资产的时间序列趋势",
-                labels={'Value': '资产价值 (美元)', 'Date': '时间'}
+
+def show_freshness(table):
+    """在页面上显示数据的更新时间"""
+    age = get_rwa_table_age(table)
+    if age is not None:
+        st.caption(f"数据更新于 {int(age)} 秒前")
+
+
+_snapshot_lock = threading.Lock()
+
+# 表名 -> 最近一次与数据库核对快照的时间。数据没有变化时不重写快照，
+# 快照的修改时间（即数据版本）保持不变，新鲜度按核对时间计算
+_snapshot_checked = {}
+
+
+def _snapshot_checked_age(table):
+    """快照距最近一次写入或核对的秒数；快照不存在时返回 None"""
+    age = snapshot_age(table)
+    checked = _snapshot_checked.get(table)
+    if age is None or checked is None:
+        return age
+    return min(age, time.time() - checked)
+
+
+def refresh_rwa_snapshot(table):
+    """
+    与数据库核对并更新本地快照（只有这一步会访问数据库），返回数据是否变化。
+    数据没有变化时不重写快照，快照的修改时间（数据版本）保持不变。
+    """
+    with _snapshot_lock:
+        changed = _sync_snapshot(table)
+        _snapshot_checked[table] = time.time()
+    return changed
+
+
+def _sync_snapshot(table):
+    """
+    增量更新快照：历史行未被修改（ingest_log 标记与快照中记录的一致）时，
+    只查询 Timestamp 大于快照最大值的新行并追加；没有 Timestamp 列的表比较表指纹。
+    快照不存在、历史行被修改或表结构变化时，从数据库流式读取重写整个快照。
+    整个过程不会把整张表读入内存。
+    """
+    metadata = read_snapshot_metadata(table)
+    marker = str(get_last_ingest(table))
+    if metadata is not None and metadata.get("ingest_marker") == marker:
+        if 'Timestamp' in read_snapshot_schema(table).names:
+            # 快照为空时 last 为 None，读取全部行
+            last = snapshot_column_max(table, 'Timestamp')
+            where = ' WHERE "Timestamp" > :last' if last is not None else ""
+            new_rows = read_rwa_frame(
+                f'SELECT * FROM {table}{where} ORDER BY "Timestamp"',
+                params={"last": _to_sql_param(last)} if last is not None else None
             )
-            st.plotly_chart(fig_assets, use_container_width=True)
+            if new_rows.empty:
+                return False
+            if append_snapshot(table, parse_rwa_dates(new_rows), metadata) is not None:
+                return True
+        elif metadata.get("fingerprint") == str(_table_fingerprint(get_db_engine(), table)):
+            return False
+    elif metadata is not None:
+        print(f"⚠️ 表 {table} 的历史数据已变化，重写快照")
+
+    time_column = get_time_column(table)
+    metadata = {"ingest_marker": marker}
+    if time_column != 'Timestamp':
+        metadata["fingerprint"] = str(_table_fingerprint(get_db_engine(), table))
+    order = f' ORDER BY "{time_column}"' if time_column else ""
+    chunks = (parse_rwa_dates(chunk) for chunk in stream_rwa_data(f"SELECT * FROM {table}{order}"))
+    write_snapshot_chunks(table, chunks, metadata)
+    return True
+
+
+def _ensure_snapshot(table):
+    """快照不存在或超过 RWA_SNAPSHOT_TTL 秒未核对时刷新快照"""
+    age = _snapshot_checked_age(table)
+    if age is None or age > get_env_int("RWA_SNAPSHOT_TTL", 3600):
+        refresh_rwa_snapshot(table)
+
+
+def _select_columns(df, columns):
+    """选取 Date 列与指定的列（忽略不存在的列）"""
+    wanted = ['Date'] + [c for c in columns if c != 'Date']
+    return df[[c for c in wanted if c in df.columns]]
+
+
+def _filter_dates(df, start=None, end=None):
+    """按 Date 列过滤日期范围（结束日期包含当天）"""
+    if start is not None:
+        df = df[df['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['Date'] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+    return df
 
-        else:
-            st.info("请从上方选择至少一个资产进行展示。")
 
+def load_rwa_columns(table, columns=None, start=None, end=None):
+    """
+    按列读取 RWA 表（带 Date 列），可选按日期范围 [start, end] 过滤。
+    启用本地快照时从内存映射的快照文件读取，只反序列化所需的列；
+    整表已在内存中（例如由后台刷新同步）时直接选列；
+    否则在数据库端只查询所选列与时间范围。
+    """
+    if snapshots_enabled():
+        _ensure_snapshot(table)
+        if columns is not None:
+            columns = ['Date'] + [c for c in columns if c != 'Date']
+        return _filter_dates(read_snapshot(table, columns), start, end)
+
+    loader = _incremental_tables.get(table)
+    if loader is not None and loader.df is not None:
+        df = _filter_dates(loader.load(), start, end)
+        return df if columns is None else _select_columns(df, columns)
+
+    if columns is None and start is None and end is None:
+        return load_rwa_table(table)
+
+    if columns is None:
+        columns = get_numeric_columns(table)
+    query, params = build_series_query(table, columns, start=start, end=end)
+    df = parse_rwa_dates(load_rwa_data(query, params=params))
+    return _select_columns(df, columns)
+
+
+def _table_in_memory(table):
+    """整表已可直接读取（本地快照或增量同步器中的 DataFrame），无需再查询数据库"""
+    if snapshots_enabled():
+        return True
+    loader = _incremental_tables.get(table)
+    return loader is not None and loader.df is not None
+
+
+def reduce_rwa_columns(table, columns, reducer, finalize=None, start=None, end=None):
+    """
+    在数据库端只查询所选列（可选日期范围），对每个分块（已带 Date 列）应用 reducer，
+    只保留归约后的结果，内存峰值取决于块大小与归约结果而非整表
+    """
+    query, params = build_series_query(table, columns, start=start, end=end)
+    df = reduce_rwa_chunks(
+        query,
+        lambda chunk: reducer(_select_columns(parse_rwa_dates(chunk), columns)),
+        params=params,
+        finalize=finalize
+    )
+    return df if not df.empty else pd.DataFrame(columns=['Date'] + list(columns))
+
+
+def _data_version(table):
+    """表数据的版本标识：快照文件修改时间或增量同步版本号；未知时返回 None（仅依赖 TTL）"""
+    if snapshots_enabled():
+        path = snapshot_path(table)
+        return os.path.getmtime(path) if os.path.exists(path) else None
+    loader = _incremental_tables.get(table)
+    if loader is not None and loader.df is not None:
+        return loader.version
+    return None
+
+
+def load_rwa_series(table, columns, granularity="日", var_name="Chain_Asset", max_points=None,
+                    start=None, end=None):
+    """
+    返回可直接绘图的长格式数据（Date, var_name, Value），按时间粒度聚合、
+    去除空值与非正值，并可限制每个序列的点数。
+    start / end（date，结束日期包含当天）在读取时过滤，降采样只作用于该范围内的数据。
+
+    结果放在进程级共享缓存中（与查询缓存共用 RWA_CACHE_MAX_MB 内存上限），
+    以紧凑形式保存：资产列为 category，Value 为 float32。
+    所有会话拿到的是同一个对象，不复制、不重复 melt，调用方只能读取不能修改。
+    """
+    columns = sorted(columns)
+    key = ("series", table, tuple(columns), granularity, var_name, max_points, start, end,
+           _data_version(table))
+    df_long = _rwa_cache.get(key)
+    if df_long is not None:
+        return df_long
+    return _rwa_flight.do(key, lambda: _build_rwa_series(key, table, columns, granularity,
+                                                          var_name, max_points, start, end))
+
+
+def _build_rwa_series(key, table, columns, granularity, var_name, max_points, start=None,
+                      end=None):
+    """load_rwa_series 的实际计算（每个 key 同时只有一个线程执行）"""
+    entry = _rwa_cache.peek(key)
+    if entry is not None and entry.age() <= _rwa_cache.ttl:
+        return entry.value
+
+    if _table_in_memory(table):
+        df = resample_frame(load_rwa_columns(table, ['Date'] + columns, start, end), granularity)
     else:
-        st.warning("数据库中没有找到链资产数据。")
-
-    st.markdown("---")
-
-    if not df_jurisdictions.empty:
-        st.subheader("各国发行价值分布 🌍")
-
-        # 处理时间列
-        if 'Timestamp' in df_jurisdictions.columns:
-            df_jurisdictions['Date'] = pd.to_datetime(df_jurisdictions['Timestamp'], unit='ms')
-        elif 'Date' in df_jurisdictions.columns:
-            df_jurisdictions['Date'] = pd.to_datetime(df_jurisdictions['Date'], format='%Y/%m/%d')
-
-        # 获取国家列
-        country_columns = df_jurisdictions.select_dtypes(include=['number']).columns.tolist()
-        if 'Date' in country_columns:
-            country_columns.remove('Date')
-        if 'Timestamp' in country_columns:
-            country_columns.remove('Timestamp')
-
-        # 初始化 session_state
-        if "selected_countries" not in st.session_state:
-            st.session_state.selected_countries = []
-
-        # 国家多选控件
-        selected_countries = st.multiselect(
-            "请选择要显示的国家/地区",
-            options=sorted(country_columns),
-            default=st.session_state.selected_countries,
-            key="country_multiselect"
-        )
+        # 只查询所选列与日期范围，逐块按粒度聚合；跨块的时间段在合并后再聚合一次
+        df = reduce_rwa_columns(table, columns, lambda chunk: resample_frame(chunk, granularity),
+                                finalize=lambda merged: resample_frame(merged, granularity),
+                                start=start, end=end)
+    with span("rwa.melt", rows=len(df)):
+        df_long = df.melt(id_vars=['Date'], value_vars=[c for c in columns if c in df.columns],
+                          var_name=var_name, value_name='Value')
+    # 去除 NaN 或 0 值以避免干扰图表
+    df_long = df_long[df_long['Value'] > 0]
+    if max_points:
+        with span("rwa.downsample", rows=len(df_long)):
+            df_long = downsample_long(df_long, 'Date', 'Value', var_name, max_points=max_points)
 
-        # 判断是否发生变化，仅当变化时才更新 session_state 并刷新
-        if selected_countries != st.session_state.selected_countries:
-            st.session_state.selected_countries = selected_countries
-            st.rerun()
-
-        # 过滤数据
-        if st.session_state.selected_countries:
-            filtered_country_df = df_jurisdictions.melt(id_vars=['Date'],
-                                                          value_vars=st.session_state.selected_countries,
-                                                          var_name='Country',
-                                                          value_name='Value')
-            filtered_country_df = filtered_country_df[filtered_country_df['Value'] > 0]
-
-            fig_countries = px.bar(
-                filtered_country_df,
-                x='Date',
-                y='Value',
-                color='Country',
-                title="所选国家的资产价值分布",
-                labels={'Value': '资产价值 (美元)', 'Date': '时间'},
-                barmode='stack'
-            )
-            st.plotly_chart(fig_countries, use_container_width=True)
+    df_long = df_long.reset_index(drop=True)
+    df_long[var_name] = df_long[var_name].astype(pd.CategoricalDtype(columns))
+    df_long['Value'] = df_long['Value'].astype('float32')
+    return _rwa_cache.set(key, df_long)
 
-        else:
-            st.info("请从上方选择至少一个国家进行展示。")
 
-    else:
-        st.warning("数据库中没有找到国家分布数据。")
-
-def show_global_bonds():
-    st.header("全球债券 🌍")
-    st.write("这是全球债券资产的信息展示区域。")
-    st.info("功能开发中...")
-
-def show_commodities():
-    st.header("大宗商品 ⛽")
-    st.write("这是大宗商品资产的信息展示区域。")
-    st.info("功能开发中...")
-
-def show_stocks():
-    st.header("股票 📈")
-    st.write("这是股票资产的信息展示区域。")
-    st.info("功能开发中...")
-
-def show_real_estate():
-    st.header("房地产 🏠")
-    st.write("这是房地产资产的信息展示区域。")
-    st.info("功能开发中...")
\ No newline at end of file
+def list_rwa_numeric_columns(table):
+    """返回表中可绘制的数值列（不含时间列），用于多选控件的选项；无需加载数据"""
+    if snapshots_enabled():
+        _ensure_snapshot(table)
+        columns = numeric_columns_from_schema(read_snapshot_schema(table))
+        return [c for c in columns if c not in ('Timestamp', 'Date')]
+    return get_numeric_columns(table)
+
+
+def get_rwa_cache_stats():
+    """返回 RWA 查询缓存的命中/未命中等统计信息（含请求合并次数）"""
+    return dict(_rwa_cache.stats(), coalescing=_rwa_flight.stats())
+
+
+def clear_rwa_cache():
+    """清空 RWA 查询缓存（例如手动导入数据之后）"""
+    _rwa_cache.invalidate()
+
+
+# ====== 目录驱动的资产页面 ======
+
+# 图表类型 -> (Plotly 函数名, 额外参数)
+CHART_KINDS = {
+    "line": ("line", {}),
+    "bar": ("bar", {"barmode": "stack"})
+}
+
+
+def _discover_tables(asset):
+    """按表名约定发现属于该资产、但未在目录中声明的表；数据库不可用时返回空列表"""
+    try:
+        tables = list_tables(asset.table_prefix)
+    except (SQLAlchemyError, ConnectionError, ValueError) as e:
+        print(f"⚠️ 无法列出 {asset.name} 的数据表：{e}")
+        return []
+    declared = set(RWA_TABLES)
+    return [t for t in tables if t not in declared]
+
+
+def asset_sections(asset):
+    """资产页面的全部区块：目录中声明的表 + 按约定自动发现的表"""
+    return asset.sections + [discovered_section(asset, t) for t in _discover_tables(asset)]
+
+
+def list_rwa_tables():
+    """所有可展示的 RWA 表（声明的与自动发现的），供后台刷新与 API 使用"""
+    tables = list(RWA_TABLES)
+    for asset in RWA_CATALOG.values():
+        tables.extend(_discover_tables(asset))
+    return tables
+
+
+def show_rwa_section(section):
+    """
+    渲染一个区块：汇总指标 → 资产多选 → 时间粒度 → 共享的长格式序列 → 图表。
+    所有资产页面共用这一条流程，长格式数据按 (表, 所选列, 粒度) 跨页面、跨会话只计算一次。
+    """
+    table = section.table
+    if section.subheader:
+        st.subheader(section.subheader)
+
+    # 只读取表结构获取可选列，无需加载数据本身
+    asset_columns = list_rwa_numeric_columns(table)
+    if not asset_columns:
+        st.warning(section.empty_message)
+        return
+
+    show_aggregates(table, section.item_label)
+
+    selected = st.multiselect(section.select_label, options=sorted(asset_columns),
+                              key=f"rwa_select_{table}")
+    granularity = select_granularity(f"rwa_granularity_{table}", index=section.granularity_index)
+    if not selected:
+        st.info("请从上方选择至少一项进行展示。")
+        return
+
+    # 只读取所选列，按粒度聚合（并按需限制点数）后的长格式数据
+    df_long = load_rwa_series(table, selected, granularity, var_name=section.var_name,
+                              max_points=MAX_POINTS_PER_SERIES if section.downsample else None)
+
+    func_name, options = CHART_KINDS[section.chart]
+    with span(f"px.{func_name}", rows=len(df_long)):
+        fig = getattr(px, func_name)(
+            df_long,
+            x='Date',
+            y='Value',
+            color=section.var_name,
+            title=section.chart_title,
+            labels={'Value': section.value_label, 'Date': '时间'},
+            **options
+        )
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+    show_freshness(table)
+
+
+def show_asset_type(key):
+    """按资产目录渲染资产页面；还没有任何数据表的资产显示占位信息"""
+    asset = get_asset_type(key)
+    st.header(f"{asset.name} {asset.icon}")
+    if asset.subheader:
+        st.subheader(asset.subheader)
+
+    sections = asset_sections(asset)
+    if not sections:
+        st.write(f"这是{asset.name}资产的信息展示区域。")
+        st.info("功能开发中...")
+        return
+
+    for idx, section in enumerate(sections):
+        if idx:
+            st.markdown("---")
+        try:
+            show_rwa_section(section)
+        except Exception as e:
+            st.error(f"加载或解析数据失败: {e}")
@@ -0,0 +1,105 @@
+# rwa_aggregates.py
+# RWA 宽表的预计算汇总指标：跨链/跨国合计、各列占比、7 日与 30 日增长率。
+# 在数据刷新时计算一次，页面只读取很小的结果表。
+
+import threading
+import time
+import pandas as pd
+
+GROWTH_WINDOWS = {"growth_7d": 7, "growth_30d": 30}
+
+# 表名 -> {"version": 数据版本, "totals": 每日合计, "summary": 各列汇总}
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+
+def _prepare(df, value_columns):
+    """宽表（Date + 数值列）按日期排序为 float64，并加上每行的合计列"""
+    frame = (
+        df[['Date'] + list(value_columns)]
+        .dropna(subset=['Date'])
+        .sort_values('Date')
+        .set_index('Date')
+        .astype('float64')
+    )
+    frame['合计'] = frame.sum(axis=1, min_count=1)
+    return frame
+
+
+def _trim_tail(filled):
+    """
+    只保留计算最新值与增长率所需的尾部：最长增长窗口内的行，
+    以及窗口前的最后一行（已前向填充，携带各列在窗口开始前的值）
+    """
+    cutoff = filled.index[-1] - pd.Timedelta(days=max(GROWTH_WINDOWS.values()))
+    first = int(filled.index.searchsorted(cutoff, side='left'))
+    return filled.iloc[max(first - 1, 0):]
+
+
+def aggregate_chunks(chunks, value_columns):
+    """
+    逐块计算汇总指标（分块需按时间升序），返回 (totals, summary)：
+    - totals：每日所有列的合计（Date, Total）
+    - summary：每列最新值、占最新合计的比例、7/30 日增长率，最后一行为合计
+    每块只保留每日合计与最近 30 日的尾部，内存不随表大小增长。
+    """
+    totals_parts = []
+    tail = None
+    for chunk in chunks:
+        frame = _prepare(chunk, value_columns)
+        if frame.empty:
+            continue
+        totals_parts.append(frame['合计'])
+        tail = frame if tail is None else pd.concat([tail, frame])
+        tail = _trim_tail(tail.ffill())
+
+    if tail is None:
+        totals = pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]'), 'Total': pd.Series(dtype='float64')})
+        return totals, pd.DataFrame(columns=['latest', 'share', *GROWTH_WINDOWS])
+    totals = pd.concat(totals_parts).rename('Total').reset_index()
+
+    # 各列以最近一个有值的数据为准
+    latest_date = tail.index[-1]
+    latest = tail.iloc[-1]
+
+    summary = pd.DataFrame({'latest': latest})
+    summary['share'] = latest / latest['合计']
+    for name, days in GROWTH_WINDOWS.items():
+        previous = tail.asof(latest_date - pd.Timedelta(days=days))
+        summary[name] = latest / previous.where(previous != 0) - 1
+    summary.index.name = 'column'
+    return totals, summary.sort_values('latest', ascending=False)
+
+
+def compute_aggregates(df, value_columns):
+    """对已在内存中的宽表计算汇总指标（见 aggregate_chunks）"""
+    return aggregate_chunks([df], value_columns)
+
+
+def materialize_aggregates(table, df, value_columns, version=None):
+    """计算并缓存表的汇总指标（数据刷新时调用）"""
+    return materialize_chunk_aggregates(table, [df], value_columns, version=version)
+
+
+def materialize_chunk_aggregates(table, chunks, value_columns, version=None):
+    """逐块计算并缓存表的汇总指标（数据不在内存中、按块流式读取时使用）"""
+    totals, summary = aggregate_chunks(chunks, value_columns)
+    result = {"version": version, "totals": totals, "summary": summary,
+              "computed_at": time.monotonic()}
+    with _aggregates_lock:
+        _aggregates[table] = result
+    return result
+
+
+def get_cached_aggregates(table, version=None, max_age=None):
+    """
+    返回已缓存且版本一致的汇总指标；不存在或已过期时返回 None。
+    数据没有版本标识时可用 max_age（秒）限制结果的有效期。
+    """
+    with _aggregates_lock:
+        result = _aggregates.get(table)
+    if result is None or (version is not None and result["version"] != version):
+        return None
+    if max_age is not None and time.monotonic() - result["computed_at"] > max_age:
+        return None
+    return result
@@ -0,0 +1,115 @@
+# rwa_catalog.py
+# RWA 资产类型目录：每种资产声明自己的宽表与图表类型，
+# 由 rwa.show_asset_type 统一渲染。新增资产只需在数据库中建表（或在此声明），无需编写新的页面函数。
+#
+# 表名约定：rwa_<资产名称>_<说明>（如 rwa_全球债券_代币）。未在目录中声明、
+# 但符合约定的表会被自动发现，并以默认配置（折线图）展示在对应资产页面下。
+
+
+class RwaSection:
+    """
+    资产页面中的一个图表区块，对应一张宽表（时间列 + 每个资产/地区一列数值）。
+    时间列不在此配置，由 rwa_query.get_time_column 从表结构识别（优先 Timestamp，其次 Date）。
+    - chart："line" 折线图或 "bar" 堆叠柱状图
+    - var_name：长格式中资产列的名称（也是图例名称）
+    - item_label：汇总指标中的单位名称（如 "链"、"国家/地区"）
+    - granularity_index：默认时间粒度（0 日、1 周、2 月）
+    - downsample：是否将每个序列降采样到 RWA_MAX_POINTS 个点
+    """
+
+    def __init__(self, table, subheader=None, chart="line",
+                 var_name="Chain_Asset", item_label="资产", select_label="请选择要显示的资产",
+                 chart_title="所选资产的时间序列趋势", value_label="资产价值 (美元)",
+                 empty_message="数据库中没有找到相关数据。", granularity_index=0,
+                 downsample=True):
+        self.table = table
+        self.subheader = subheader
+        self.chart = chart
+        self.var_name = var_name
+        self.item_label = item_label
+        self.select_label = select_label
+        self.chart_title = chart_title
+        self.value_label = value_label
+        self.empty_message = empty_message
+        self.granularity_index = granularity_index
+        self.downsample = downsample
+
+
+class RwaAssetType:
+    """一种资产类型：页面标题与若干图表区块"""
+
+    def __init__(self, key, name, icon, subheader=None, sections=()):
+        self.key = key
+        self.name = name
+        self.icon = icon
+        self.subheader = subheader
+        self.sections = list(sections)
+
+    @property
+    def table_prefix(self):
+        """按约定属于该资产的表名前缀"""
+        return f"rwa_{self.name}_"
+
+
+# 资产类型目录（按侧边栏顺序）
+RWA_CATALOG = {
+    "stablecoin": RwaAssetType(
+        "stablecoin", "稳定币", "🪙",
+        subheader="各链上稳定币市场价值（Bridged Token Market Cap）",
+        sections=[
+            RwaSection(
+                "rwa_稳定币_代币",
+                item_label="链",
+                select_label="请选择要显示的稳定币资产",
+                chart_title="所选稳定币资产的时间序列趋势",
+                value_label="市场价值 (美元)"
+            )
+        ]
+    ),
+    "treasury_bonds": RwaAssetType(
+        "treasury_bonds", "美国国债", "🏦",
+        subheader="各链上代币化资产价值（Bridged Token Value）",
+        sections=[
+            RwaSection(
+                "rwa_美国国债_代币",
+                item_label="链",
+                select_label="请选择要显示的链上资产",
+                empty_message="数据库中没有找到链资产数据。"
+            ),
+            # 堆叠柱状图默认按月聚合，避免每天一组柱子
+            RwaSection(
+                "rwa_美国国债_管辖权",
+                subheader="各国发行价值分布 🌍",
+                chart="bar",
+                var_name="Country",
+                item_label="国家/地区",
+                select_label="请选择要显示的国家/地区",
+                chart_title="所选国家的资产价值分布",
+                empty_message="数据库中没有找到国家分布数据。",
+                granularity_index=2,
+                downsample=False
+            )
+        ]
+    ),
+    "global_bonds": RwaAssetType("global_bonds", "全球债券", "🌍"),
+    "commodities": RwaAssetType("commodities", "大宗商品", "⛽"),
+    "stocks": RwaAssetType("stocks", "股票", "📈"),
+    "real_estate": RwaAssetType("real_estate", "房地产", "🏠")
+}
+
+DEFAULT_ASSET_TYPE = "stablecoin"
+
+
+def get_asset_type(key):
+    """按 key 获取资产类型，未知时返回默认资产"""
+    return RWA_CATALOG.get(key) or RWA_CATALOG[DEFAULT_ASSET_TYPE]
+
+
+def declared_tables():
+    """目录中显式声明的全部表（按声明顺序）"""
+    return [section.table for asset in RWA_CATALOG.values() for section in asset.sections]
+
+
+def discovered_section(asset, table):
+    """按表名约定发现的表使用默认配置，副标题取表名中资产名称之后的部分"""
+    return RwaSection(table, subheader=table[len(asset.table_prefix):] or None)
@@ -0,0 +1,126 @@
+# rwa_query.py
+# RWA 宽表的按列查询构造器与表结构目录（information_schema）缓存
+
+from datetime import datetime, date, timezone
+from sqlalchemy import text, inspect
+from sqlalchemy.types import Integer, Numeric, Float
+from cache import TTLCache
+from config import get_env_int
+from db import get_db_engine
+
+# 表结构很少变化，单独缓存较长时间（RWA_CATALOG_TTL，秒）
+_catalog_cache = TTLCache(ttl=get_env_int("RWA_CATALOG_TTL", 3600))
+
+_NUMERIC_TYPES = {
+    "smallint", "integer", "bigint", "numeric", "decimal",
+    "real", "double precision"
+}
+
+
+def quote_ident(name, engine=None):
+    """
+    安全地为表名/列名加引号（支持中文等 Unicode 标识符）。
+    总是加引号，并按方言规则转义名称中的引号。
+    """
+    engine = engine or get_db_engine()
+    return engine.dialect.identifier_preparer.quote_identifier(name)
+
+
+def _load_columns(engine, table):
+    """读取表的 (列名, 是否数值列) 列表"""
+    if engine.dialect.name == "postgresql":
+        sql = text(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = :table ORDER BY ordinal_position"
+        )
+        with engine.connect() as conn:
+            rows = conn.execute(sql, {"table": table}).all()
+        return [(name, data_type in _NUMERIC_TYPES) for name, data_type in rows]
+
+    # 其他数据库（如本地 SQLite）没有 information_schema，使用 SQLAlchemy 反射
+    columns = inspect(engine).get_columns(table)
+    return [(c["name"], isinstance(c["type"], (Integer, Numeric, Float))) for c in columns]
+
+
+def get_table_columns(table):
+    """返回表的 (列名, 是否数值列) 列表，结果跨会话缓存"""
+    columns = _catalog_cache.get(table)
+    if columns is None:
+        columns = _catalog_cache.set(table, _load_columns(get_db_engine(), table))
+    return columns
+
+
+def get_numeric_columns(table):
+    """返回表中的数值列名（不含时间列），用于多选控件的选项"""
+    return [
+        name for name, is_numeric in get_table_columns(table)
+        if is_numeric and name not in ("Timestamp", "Date")
+    ]
+
+
+def list_tables(prefix=""):
+    """返回数据库中以 prefix 开头的表名（结果与列信息一起缓存）"""
+    tables = _catalog_cache.get("__tables__")
+    if tables is None:
+        tables = _catalog_cache.set("__tables__", sorted(inspect(get_db_engine()).get_table_names()))
+    return [t for t in tables if t.startswith(prefix)]
+
+
+def get_time_column(table):
+    """返回表的时间列：优先 Timestamp（毫秒），其次 Date（YYYY/MM/DD 文本）"""
+    names = [name for name, _ in get_table_columns(table)]
+    for candidate in ("Timestamp", "Date"):
+        if candidate in names:
+            return candidate
+    return None
+
+
+def _time_bound(value, time_column, end_of_day=False):
+    """将日期转换为时间列可比较的值（结束日期包含当天）"""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        day_time = datetime.max.time() if end_of_day else datetime.min.time()
+        value = datetime.combine(value, day_time)
+    if time_column == "Timestamp":
+        # Timestamp 列为 UTC 毫秒
+        return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return value.strftime("%Y/%m/%d")
+
+
+def build_series_query(table, columns, start=None, end=None):
+    """
+    构造只包含时间列与所选列的 SELECT 语句，可选按日期范围过滤。
+    返回 (SQL 文本, 绑定参数)；标识符全部加引号，过滤值走绑定参数。
+    """
+    engine = get_db_engine()
+    time_column = get_time_column(table)
+    known = {name for name, _ in get_table_columns(table)}
+
+    selected = [c for c in columns if c in known and c != time_column]
+    select_list = [time_column] + selected if time_column else selected
+    if not select_list:
+        raise ValueError(f"表 {table} 中没有可查询的列：{columns}")
+
+    sql = "SELECT {} FROM {}".format(
+        ", ".join(quote_ident(c, engine) for c in select_list),
+        quote_ident(table, engine)
+    )
+
+    params = {}
+    if time_column:
+        conditions = []
+        if start is not None:
+            conditions.append(f"{quote_ident(time_column, engine)} >= :start")
+            params["start"] = _time_bound(start, time_column)
+        if end is not None:
+            conditions.append(f"{quote_ident(time_column, engine)} <= :end")
+            params["end"] = _time_bound(end, time_column, end_of_day=True)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {quote_ident(time_column, engine)}"
+
+    return sql, params
+
+
+def clear_catalog_cache():
+    """清空表结构缓存（例如新增列之后）"""
+    _catalog_cache.invalidate()
@@ -0,0 +1,169 @@
+# rwa_snapshot.py
+# RWA 数据的本地列式快照：每张表保存为一个 Arrow IPC 文件，
+# 读取时使用内存映射并只反序列化需要的列。
+# 需要安装 pyarrow 并设置 RWA_SNAPSHOT_DIR，否则快照功能自动关闭。
+
+import os
+import time
+from dotenv import load_dotenv
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute
+    import pyarrow.ipc
+except ImportError:  # pyarrow 为可选依赖
+    pa = None
+
+# .env 只在导入时读取一次（snapshots_enabled 在每次页面运行中会被多次调用）
+load_dotenv()
+
+
+def get_snapshot_dir():
+    """返回快照目录（来自环境变量 RWA_SNAPSHOT_DIR），未配置时返回 None"""
+    return os.getenv("RWA_SNAPSHOT_DIR") or None
+
+
+def snapshots_enabled():
+    """pyarrow 可用且配置了快照目录时启用快照"""
+    return pa is not None and get_snapshot_dir() is not None
+
+
+def snapshot_path(table):
+    """返回表对应的快照文件路径"""
+    return os.path.join(get_snapshot_dir(), f"{table}.arrow")
+
+
+def snapshot_age(table):
+    """返回快照距今的秒数；快照不存在时返回 None"""
+    path = snapshot_path(table)
+    if not os.path.exists(path):
+        return None
+    return time.time() - os.path.getmtime(path)
+
+
+def _with_metadata(schema, metadata):
+    """在 schema 上附加快照元数据（保留 pandas 写入的元数据）"""
+    merged = dict(schema.metadata or {})
+    merged.update({str(k).encode(): str(v).encode() for k, v in (metadata or {}).items()})
+    return schema.with_metadata(merged)
+
+
+def _replace_snapshot(table, write):
+    """写入临时文件后原子替换快照；write(sink) 负责写入内容"""
+    directory = get_snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(table)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            write(sink)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def write_snapshot_chunks(table, chunks, metadata=None):
+    """
+    流式写入快照：每个 DataFrame 分块转换为一个 Arrow 记录批次后立即写出，
+    内存中只保留当前分块。使用未压缩的 Arrow IPC 格式（而非 Parquet），以便读取时可直接内存映射；
+    先写临时文件再原子替换，正在读取旧快照的会话不受影响。后续分块按第一块的 schema 对齐（如整数列出现空值后变为浮点）。
+    metadata 为写入 schema 的键值对（如数据库指纹），可用 read_snapshot_metadata 读取。
+    """
+    def write(sink):
+        writer = None
+        schema = None
+        try:
+            for chunk in chunks:
+                batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = _with_metadata(batch.schema, metadata)
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_table(batch.select(schema.names).cast(schema, safe=False))
+            if writer is None:
+                # 没有任何数据时写入空快照
+                writer = pa.ipc.new_file(sink, _with_metadata(pa.schema([]), metadata))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    return _replace_snapshot(table, write)
+
+
+def append_snapshot(table, df, metadata=None):
+    """
+    将新行追加到已有快照：旧数据以内存映射方式直接写入新文件，不加载到内存。
+    新行的列与快照不一致（如表新增了列）或快照为空时不追加并返回 None，由调用方重写整个快照。
+    """
+    with pa.memory_map(snapshot_path(table), "r") as source:
+        existing = pa.ipc.open_file(source).read_all()
+        # 空快照的列类型未知（全为 null），同样交给调用方重写
+        if existing.num_rows == 0 or set(df.columns) != set(existing.column_names):
+            return None
+        schema = _with_metadata(existing.schema, metadata)
+        new_rows = pa.Table.from_pandas(df, preserve_index=False).select(schema.names)
+        new_rows = new_rows.cast(schema, safe=False)
+
+        def write(sink):
+            with pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(existing.cast(schema))
+                writer.write_table(new_rows)
+
+        return _replace_snapshot(table, write)
+
+
+def read_snapshot_metadata(table):
+    """读取快照写入时附加的元数据（字符串字典）；快照不存在时返回 None"""
+    if not os.path.exists(snapshot_path(table)):
+        return None
+    metadata = read_snapshot_schema(table).metadata or {}
+    return {k.decode(): v.decode() for k, v in metadata.items()}
+
+
+def snapshot_column_max(table, column):
+    """快照中某列的最大值（只读取该列）；列不存在或没有数据时返回 None"""
+    with pa.memory_map(snapshot_path(table), "r") as source:
+        arrow_table = pa.ipc.open_file(source).read_all()
+        if column not in arrow_table.column_names:
+            return None
+        return pa.compute.max(arrow_table.column(column)).as_py()
+
+
+def iter_snapshot_chunks(table, columns=None):
+    """按记录批次逐块读取快照，每次只把一个批次转换为 DataFrame"""
+    with pa.memory_map(snapshot_path(table), "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select([c for c in columns if c in batch.schema.names])
+            yield batch.to_pandas()
+
+
+def read_snapshot_schema(table):
+    """只读取快照的 schema（不加载任何数据）"""
+    with pa.memory_map(snapshot_path(table), "r") as source:
+        return pa.ipc.open_file(source).schema
+
+
+def read_snapshot(table, columns=None):
+    """
+    以内存映射方式读取快照并返回 DataFrame。
+    指定 columns 时只转换这些列，其余列不会被读入内存。
+    """
+    with pa.memory_map(snapshot_path(table), "r") as source:
+        arrow_table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            arrow_table = arrow_table.select(
+                [c for c in columns if c in arrow_table.column_names]
+            )
+        return arrow_table.to_pandas()
+
+
+def numeric_columns_from_schema(schema):
+    """从快照 schema 中挑选数值列名"""
+    return [
+        field.name for field in schema
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+    ]
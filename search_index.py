@@ -0,0 +1,156 @@
+# search_index.py
+# 已获取事件的内存倒排索引：按关键词、标签本地检索，无需每次输入都请求 API
+
+import bisect
+import math
+import re
+import threading
+
+# 英文/数字按单词切分，中日韩文字按单字切分
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+
+# 各字段的权重：标题最重要，其次标签与市场问题，最后是描述
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "questions": 1.5,
+    "description": 1.0
+}
+
+
+def tokenize(text):
+    """将文本切分为小写词元"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+def _event_fields(event):
+    """提取事件中参与检索的各字段文本"""
+    return {
+        "title": event.get("title") or "",
+        "description": event.get("description") or "",
+        "tags": " ".join(tag.get("label") or "" for tag in event.get("tags") or []),
+        "questions": " ".join(m.get("question") or "" for m in event.get("markets") or [])
+    }
+
+
+class EventIndex:
+    """
+    事件倒排索引。add_events 可重复调用（按 id 去重），新页面到达时增量更新。
+    search 对所有关键词做 AND 匹配，最后一个词按前缀匹配（适合边输入边检索），
+    结果按字段加权的 TF-IDF 得分排序。
+    """
+
+    def __init__(self):
+        self._events = {}
+        # 每个事件索引过的词元，用于更新时只清理相关的倒排表
+        self._event_tokens = {}
+        self._postings = {}
+        self._tag_postings = {}
+        self._vocabulary = []
+        self._tag_vocabulary = []
+        self._vocabulary_dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add_events(self, events):
+        """增量加入事件，已索引的事件会被更新；返回新增的事件数"""
+        added = 0
+        with self._lock:
+            for event in events or []:
+                event_id = event.get("id") or event.get("slug")
+                if event_id is None:
+                    continue
+                if event_id in self._events:
+                    if self._events[event_id] == event:
+                        continue
+                    self._remove(event_id)
+                else:
+                    added += 1
+                self._events[event_id] = event
+
+                tokens, tag_tokens = set(), set()
+                for field, text in _event_fields(event).items():
+                    weight = FIELD_WEIGHTS[field]
+                    for token in tokenize(text):
+                        postings = self._postings.setdefault(token, {})
+                        postings[event_id] = postings.get(event_id, 0.0) + weight
+                        tokens.add(token)
+                for tag in event.get("tags") or []:
+                    for token in tokenize(tag.get("label")):
+                        self._tag_postings.setdefault(token, set()).add(event_id)
+                        tag_tokens.add(token)
+                self._event_tokens[event_id] = (tokens, tag_tokens)
+                self._vocabulary_dirty = True
+        return added
+
+    def _remove(self, event_id):
+        tokens, tag_tokens = self._event_tokens.pop(event_id, (set(), set()))
+        for token in tokens:
+            self._postings[token].pop(event_id, None)
+        for token in tag_tokens:
+            self._tag_postings[token].discard(event_id)
+
+    def _refresh_vocabulary(self):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(t for t, p in self._postings.items() if p)
+            self._tag_vocabulary = sorted(t for t, p in self._tag_postings.items() if p)
+            self._vocabulary_dirty = False
+
+    @staticmethod
+    def _prefix_tokens(vocabulary, prefix):
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + "\uffff")
+        return vocabulary[start:end]
+
+    def _match(self, tokens, postings, vocabulary):
+        """返回 {event_id: 得分}；最后一个词元按前缀扩展"""
+        scores = None
+        total = max(len(self._events), 1)
+        for i, token in enumerate(tokens):
+            candidates = [token]
+            if i == len(tokens) - 1:
+                candidates = self._prefix_tokens(vocabulary, token) or [token]
+            token_scores = {}
+            for candidate in candidates:
+                matches = postings.get(candidate)
+                if not matches:
+                    continue
+                idf = math.log(1 + total / len(matches))
+                for event_id, weight in (matches.items() if isinstance(matches, dict)
+                                         else ((e, 1.0) for e in matches)):
+                    token_scores[event_id] = token_scores.get(event_id, 0.0) + weight * idf
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {e: s + token_scores[e] for e, s in scores.items() if e in token_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search(self, keyword=None, tag=None, limit=None):
+        """按关键词（标题/描述/标签/市场问题）与标签检索，返回按相关度排序的事件列表"""
+        keyword_tokens = tokenize(keyword)
+        tag_tokens = tokenize(tag)
+        if not keyword_tokens and not tag_tokens:
+            return []
+
+        with self._lock:
+            self._refresh_vocabulary()
+            scores = None
+            if keyword_tokens:
+                scores = self._match(keyword_tokens, self._postings, self._vocabulary)
+            if tag_tokens:
+                tag_scores = self._match(tag_tokens, self._tag_postings, self._tag_vocabulary)
+                if scores is None:
+                    scores = tag_scores
+                else:
+                    scores = {e: s + tag_scores[e] for e, s in scores.items() if e in tag_scores}
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [self._events[event_id] for event_id, _ in ranked]
@@ -1,4 +1,10 @@
 # 语言翻译模块
+
+import json
+import os
+import threading
+from collections import namedtuple
+
 LANGUAGES = {
     "中文": {
         "page_title": "Polymarket 事件检索",
@@ -49,7 +55,19 @@ LANGUAGES = {
         "volume_1yr": "1年",
         "status": "状态",
         "status_open": "开放",
-        "status_closed": "已关闭"
+        "status_closed": "已关闭",
+        "bulk_mode_label": "一次加载全部事件",
+        "sort_by_label": "排序方式",
+        "sort_default": "默认",
+        "sort_volume": "成交量",
+        "sort_start_date": "开始时间",
+        "sort_end_date": "结束时间",
+        "price_history": "价格历史",
+        "consolidated_detail_label": "合并展示全部市场",
+        "show_market_charts": "加载图表",
+        "time_period": "时间周期",
+        "market_info": "市场信息",
+        "market_icon": "市场图标"
     },
     "English": {
         "page_title": "Polymarket Event Search",
@@ -100,10 +118,96 @@ LANGUAGES = {
         "volume_1yr": "1 Year",
         "status": "Status",
         "status_open": "Open",
-        "status_closed": "Closed"
+        "status_closed": "Closed",
+        "bulk_mode_label": "Load All Events at Once",
+        "sort_by_label": "Sort By",
+        "sort_default": "Default",
+        "sort_volume": "Volume",
+        "sort_start_date": "Start Date",
+        "sort_end_date": "End Date",
+        "price_history": "Price History",
+        "consolidated_detail_label": "Consolidated Market View",
+        "show_market_charts": "Load Charts",
+        "time_period": "Time Period",
+        "market_info": "Market Info",
+        "market_icon": "Market Icon"
     }
 }
 
+# 所有语言都必须提供与基准语言相同的键
+BASE_LANGUAGE = "English"
+
+# 额外语言文件目录：<目录>/<语言名>.json，内容为 {键: 文本}，首次使用该语言时才读取
+TRANSLATIONS_DIR = os.getenv(
+    "TRANSLATIONS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations")
+)
+
+LABEL_KEYS = tuple(sorted(LANGUAGES[BASE_LANGUAGE]))
+
+# 每种语言一个不可变的标签包：labels.page_title 或 labels[i]（按 LABEL_KEYS 的顺序）
+Labels = namedtuple("Labels", LABEL_KEYS)
+
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+
+def _validate(language, table):
+    """检查语言表的键是否与基准语言一致，返回 (缺失的键, 多余的键)"""
+    missing = sorted(set(LABEL_KEYS) - set(table))
+    extra = sorted(set(table) - set(LABEL_KEYS))
+    return missing, extra
+
+
+# 导入时校验内置语言，缺少键时直接报错，避免页面上出现未翻译的键名
+for _language, _table in LANGUAGES.items():
+    _missing, _extra = _validate(_language, _table)
+    if _missing or _extra:
+        raise ValueError(f"语言 {_language} 的翻译键不完整：缺少 {_missing}，多余 {_extra}")
+
+
+def available_languages():
+    """内置语言加上翻译目录中的语言文件（只列出文件名，不读取内容）"""
+    languages = list(LANGUAGES)
+    if os.path.isdir(TRANSLATIONS_DIR):
+        for name in sorted(os.listdir(TRANSLATIONS_DIR)):
+            stem, ext = os.path.splitext(name)
+            if ext == ".json" and stem not in languages:
+                languages.append(stem)
+    return languages
+
+
+def _load_language_file(language):
+    """读取语言文件；缺少的键用基准语言补齐并给出提示"""
+    path = os.path.join(TRANSLATIONS_DIR, f"{language}.json")
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    missing, extra = _validate(language, table)
+    if missing or extra:
+        print(f"⚠️ 语言文件 {path}：缺少 {missing}（使用 {BASE_LANGUAGE} 补齐），忽略多余的 {extra}")
+    base = LANGUAGES[BASE_LANGUAGE]
+    return {key: table.get(key, base[key]) for key in LABEL_KEYS}
+
+
+def get_labels(language=BASE_LANGUAGE):
+    """
+    返回指定语言的标签包（每种语言只构建一次）。每次页面运行取一次，
+    之后用属性访问代替 get_translation 的字典查找；未知语言使用基准语言。
+    """
+    bundle = _bundles.get(language)
+    if bundle is not None:
+        return bundle
+
+    with _bundles_lock:
+        bundle = _bundles.get(language)
+        if bundle is None:
+            table = LANGUAGES.get(language) or _load_language_file(language)
+            if table is not None:
+                bundle = _bundles[language] = Labels(**{key: table[key] for key in LABEL_KEYS})
+    return bundle if bundle is not None else get_labels(BASE_LANGUAGE)
+
+
 def get_translation(key, language="English"):
-    """获取指定语言的翻译文本"""
-    return LANGUAGES.get(language, {}).get(key, key)
\ No newline at end of file
+    """获取指定语言的翻译文本（未知的键原样返回）"""
+    return getattr(get_labels(language), key, key)
\ No newline at end of file
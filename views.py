@@ -0,0 +1,64 @@
+# views.py
+# 视图注册与分发：每个视图声明自己的数据加载函数，只有当前激活的视图才会执行加载
+
+import importlib
+import threading
+
+
+class View:
+    """一个页面视图：render(data) 负责展示，loaders 声明它依赖的数据（名称 -> 加载函数）"""
+
+    def __init__(self, name, render, loaders=None):
+        self.name = name
+        self.render = render
+        self.loaders = loaders or {}
+
+    def load(self):
+        """只执行本视图声明的加载函数"""
+        return {key: loader() for key, loader in self.loaders.items()}
+
+
+_views = {}
+_default_view = None
+
+
+def register_view(name, render, loaders=None, default=False):
+    """注册视图；default=True 的视图在名称未知时使用"""
+    global _default_view
+    _views[name] = View(name, render, loaders)
+    if default or _default_view is None:
+        _default_view = name
+    return _views[name]
+
+
+def get_view(name):
+    """按名称获取视图，未注册时返回默认视图"""
+    return _views.get(name) or _views[_default_view]
+
+
+def dispatch(name):
+    """加载并渲染当前激活的视图"""
+    view = get_view(name)
+    view.render(view.load())
+
+
+# 已在后台预热（或正在预热）的模块
+_warmed = set()
+_warm_lock = threading.Lock()
+
+
+def _import_quietly(module_name):
+    try:
+        importlib.import_module(module_name)
+    except Exception as e:
+        print(f"⚠️ 预热模块 {module_name} 失败：{e}")
+
+
+def warm_modules(module_names):
+    """在后台线程中导入重量级模块（每个进程每个模块只预热一次）"""
+    with _warm_lock:
+        pending = [m for m in module_names if m not in _warmed]
+        _warmed.update(pending)
+    for module_name in pending:
+        threading.Thread(target=_import_quietly, args=(module_name,),
+                         name=f"warm-{module_name}", daemon=True).start()